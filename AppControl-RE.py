@@ -1,14 +1,13 @@
 import csv
 import psutil
 import logging
-import logging.handlers
 import ctypes
 from ctypes import wintypes
-import gc
 import os
 import pefile
 import hashlib
 from time import sleep
+from dlp_logging import setup_logging
 
 # Define the path to the CSV file and log file
 csv_file_path = r"C:\Program Files\OCBC\OCBCDLP\BlockedApps.csv"
@@ -18,10 +17,8 @@ log_file_path = os.path.join(log_file_dir, "BlockedApps.log")
 # Create the directory if it doesn't exist
 os.makedirs(log_file_dir, exist_ok=True)
 
-# Set up logging with rotation
-log_handler = logging.handlers.RotatingFileHandler(
-    log_file_path, maxBytes=5 * 1024 * 1024, backupCount=5)
-logging.basicConfig(handlers=[log_handler], level=logging.INFO, format='%(asctime)s - %(message)s')
+# Set up queued logging with rotation into compressed segments
+setup_logging(log_file_path, max_bytes=5 * 1024 * 1024, backup_count=5)
 
 # Log the start of the script
 logging.info("Script started.")
@@ -239,8 +236,6 @@ def terminate_matching_processes(blocked_apps):
                     
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
             logging.error(f"Error processing: {e}")
-    # Release resources
-    gc.collect()
 
 def whitelist_existing_processes():
     """Whitelist all existing processes at the time the script starts."""
@@ -257,8 +252,6 @@ def main():
     while True:
         terminate_matching_processes(blocked_apps)
         sleep(5)  # Check every 5 seconds
-        # Release resources
-        gc.collect()
 
 if __name__ == "__main__":
     main()
@@ -7,13 +7,14 @@ import logging
 import logging.handlers
 import ctypes
 from ctypes import wintypes
-import gc
 import os
 import signal
 import sys
+import threading
 import pefile
 import hashlib
-from time import sleep
+from dlp_process_events import ProcessStartWorker, WmiProcessStartSource
+from dlp_scheduler import AdaptivePollScheduler
 
 # Define the paths
 csv_file_path = r"C:\Program Files\OCBC\OCBCDLP\BlockedApps.csv"
@@ -49,6 +50,13 @@ CloseHandle = kernel32.CloseHandle
 whitelisted_processes = set()
 checked_processes = set()
 
+# Check processes as they start (WMI process start trace); the sweep then only
+# reconciles at a low frequency. A check takes over 2 seconds (DLL capture), so
+# a pid is claimed in checked_processes before it is checked and neither the
+# worker nor the sweep checks it twice.
+process_start_enforcement = True
+checked_lock = threading.Lock()
+
 def is_admin_process(proc):
     """Check if the process is running with admin privileges."""
     try:
@@ -253,53 +261,100 @@ def match_process(proc, blocked_apps):
         logging.error(f"General error: {e}")
     return False, {}, 0, {"DLLs": False, "Import Table": False, "Optional Headers and Data Directories": False}
 
+def claim_process(pid):
+    """Mark pid as checked; returns False if it is whitelisted or already claimed."""
+    with checked_lock:
+        if pid in whitelisted_processes or pid in checked_processes:
+            return False
+        checked_processes.add(pid)
+        return True
+
+def check_process(proc, proc_exe, blocked_apps):
+    """Check one claimed process and terminate it on a match; returns True if terminated."""
+    if not proc_exe:
+        # Executable unreadable for now; released so the next sweep retries it, as before
+        with checked_lock:
+            checked_processes.discard(proc.pid)
+        return False
+    try:
+        if any(proc_exe.lower().startswith(path) for path in [
+            r'c:\windows', r'c:\program files', r'c:\program files (x86)', r'c:\ocbc'
+        ]):
+            return False
+
+        logging.info(f"Checking process: {proc_exe} (PID: {proc.pid})")
+        is_match, blocked_app, match_percentage, match_results = match_process(proc, blocked_apps)
+        if is_match:
+            if not is_admin_process(proc):
+                proc.terminate()
+                log_message = (
+                    f"Terminated process: {proc_exe} | "
+                    f"Blocked App: {blocked_app} | "
+                    f"Similarity: {match_percentage}% | "
+                    f"Match Results: {match_results}"
+                )
+                logging.info(log_message)
+                return True
+            log_message = (
+                f"Matched but not terminated (admin/system): {proc_exe} | "
+                f"Blocked App: {blocked_app} | "
+                f"Similarity: {match_percentage}% | "
+                f"Match Results: {match_results}"
+            )
+            logging.info(log_message)
+        else:
+            logging.info(f"No match found for process: {proc_exe} (PID: {proc.pid})")
+        return False
+
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
+        # Released so the next sweep retries it, as before
+        with checked_lock:
+            checked_processes.discard(proc.pid)
+        logging.error(f"Error processing: {e}")
+        return False
+
 def terminate_matching_processes(blocked_apps):
-    """Terminate matching processes and log the actions."""
+    """Terminate matching processes and log the actions; returns the number terminated."""
+    terminated = 0
     for proc in psutil.process_iter(['pid', 'exe']):
+        if claim_process(proc.pid) and check_process(proc, proc.info['exe'], blocked_apps):
+            terminated += 1
+    return terminated
+
+def start_process_start_worker(scheduler, blocked_apps):
+    """Check every started process as soon as it is reported; returns the worker, or None if unavailable."""
+    def check_started_process(event):
+        with checked_lock:
+            # A start event means a new process; a reused pid is checked again
+            whitelisted_processes.discard(event.pid)
+            checked_processes.discard(event.pid)
+        if not claim_process(event.pid):
+            return False
         try:
-            if proc.pid in whitelisted_processes or proc.pid in checked_processes:
-                continue
-
-            proc_exe = proc.info['exe']
-            if not proc_exe or any(proc_exe.lower().startswith(path) for path in [
-                r'c:\windows', r'c:\program files', r'c:\program files (x86)', r'c:\ocbc'
-            ]):
-                continue
+            proc = psutil.Process(event.pid)
+            proc_exe = event.exe or proc.exe()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.AccessDenied:
+            proc_exe = None
+        return check_process(proc, proc_exe, blocked_apps)
 
-            logging.info(f"Checking process: {proc_exe} (PID: {proc.pid})")
-            is_match, blocked_app, match_percentage, match_results = match_process(proc, blocked_apps)
-            if is_match:
-                if not is_admin_process(proc):
-                    proc.terminate()
-                    log_message = (
-                        f"Terminated process: {proc_exe} | "
-                        f"Blocked App: {blocked_app} | "
-                        f"Similarity: {match_percentage}% | "
-                        f"Match Results: {match_results}"
-                    )
-                    logging.info(log_message)
-                else:
-                    log_message = (
-                        f"Matched but not terminated (admin/system): {proc_exe} | "
-                        f"Blocked App: {blocked_app} | "
-                        f"Similarity: {match_percentage}% | "
-                        f"Match Results: {match_results}"
-                    )
-                    logging.info(log_message)
-            else:
-                logging.info(f"No match found for process: {proc_exe} (PID: {proc.pid})")
-            checked_processes.add(proc.pid)
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-            logging.error(f"Error processing: {e}")
-    # Release resources
-    gc.collect()
+    # Dropped events are picked up by the reconciliation sweep
+    worker = ProcessStartWorker(WmiProcessStartSource(), check_started_process, on_overflow=scheduler.wake)
+    try:
+        worker.start()
+    except Exception as e:
+        logging.error(f"Error subscribing to process start events, sweeping every {scheduler.active_interval} s: {e}")
+        return None
+    logging.info("Subscribed to process start events")
+    return worker
 
 def whitelist_existing_processes():
     """Whitelist all existing processes at the time the script starts."""
     for proc in psutil.process_iter(['pid', 'exe']):
         try:
-            whitelisted_processes.add(proc.pid)
+            with checked_lock:
+                whitelisted_processes.add(proc.pid)
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             continue
 
@@ -307,13 +362,23 @@ def main():
     """Main function to run the script."""
     whitelist_existing_processes()
     blocked_apps = load_blocked_apps(csv_file_path)
-    # Check all existing processes at startup
-    terminate_matching_processes(blocked_apps)
+    # Started processes are checked by the worker as they appear; the sweep only
+    # reconciles (processes started before the subscription or dropped events),
+    # more often while it keeps finding blocked apps
+    scheduler = AdaptivePollScheduler(idle_interval=60, active_interval=5)
+    worker = None
+    if process_start_enforcement:
+        worker = start_process_start_worker(scheduler, blocked_apps)
+    if worker is None:
+        scheduler.idle_interval = scheduler.active_interval = 5  # Check every 5 seconds
     while True:
-        terminate_matching_processes(blocked_apps)
-        sleep(5)  # Check every 5 seconds
-        # Release resources
-        gc.collect()
+        started = time.process_time()
+        active = terminate_matching_processes(blocked_apps) > 0
+        if worker and worker.source.down:
+            # The start trace is being recreated; sweep at the short interval meanwhile
+            active = True
+        scheduler.record_cycle(time.process_time() - started, active)
+        scheduler.wait(scheduler.next_interval(active))
 
 if __name__ == "__main__":
     def signal_handler(sig, frame):
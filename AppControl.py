@@ -1,12 +1,18 @@
-import csv
 import psutil
 import time
 import logging
-import logging.handlers
 import ctypes
 from ctypes import wintypes
-import gc
 import os
+import statistics
+import threading
+from collections import deque
+from dlp_blocklist import BlocklistWatcher
+from dlp_logging import setup_logging
+from dlp_process_events import ProcessStartWorker, WmiProcessStartSource
+from dlp_scheduler import AdaptivePollScheduler
+from dlp_verdicts import VerdictMemo
+from dlp_version_info import VersionInfoCache
 
 # Define the path to the CSV file and log file
 csv_file_path = r"C:\Program Files\OCBC\OCBCDLP\BlockedApps.csv"
@@ -16,14 +22,25 @@ log_file_path = os.path.join(log_file_dir, "BlockedApps.log")
 # Create the directory if it doesn't exist
 os.makedirs(log_file_dir, exist_ok=True)
 
-# Set up logging with rotation
-log_handler = logging.handlers.RotatingFileHandler(
-    log_file_path, maxBytes=5 * 1024 * 1024, backupCount=5)
-logging.basicConfig(handlers=[log_handler], level=logging.INFO, format='%(asctime)s - %(message)s')
+# Set up queued logging with rotation into compressed segments
+setup_logging(log_file_path, max_bytes=5 * 1024 * 1024, backup_count=5)
 
 # Log the start of the script
 logging.info("Script started.")
 
+# Check processes as they start (WMI process start trace) instead of only in
+# the periodic sweep, which then runs as a low-frequency reconciliation
+process_start_enforcement = True
+
+# Serializes the worker and the sweep over the version info cache and verdict memo
+enforcement_lock = threading.Lock()
+
+# Version info caches by CSV columns; only the current columns' cache is kept
+version_info_caches = {}
+
+# Launch-to-terminate seconds of processes terminated by the sweep
+sweep_latencies = deque(maxlen=1000)
+
 # Constants for accessing file properties
 kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
 advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
@@ -65,16 +82,6 @@ def is_admin_process(proc):
         logging.error(f"Error checking if process is admin: {e}")
         return False
 
-def load_blocked_apps(csv_file_path):
-    """Load the list of blocked apps from the CSV file."""
-    blocked_apps = []
-    with open(csv_file_path, mode='r') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            if all(row[key] for key in row):  # Skip rows with missing values
-                blocked_apps.append(row)
-    return blocked_apps
-
 def get_file_version_info(file_path):
     """Get the version info of a file."""
     size = GetFileVersionInfoSize(file_path, None)
@@ -119,71 +126,162 @@ def get_file_properties(file_path, keys):
     
     return props
 
-def match_process(proc, blocked_apps):
-    """Match a process against the list of blocked apps."""
-    try:
-        proc_exe = proc.info['exe']
-        if not proc_exe:
-            return False, {}, {}
+def version_info_cache_for(blocklist):
+    """Cache of the file properties named by the CSV columns, kept across reloads with the same columns."""
+    keys = tuple(blocklist.keys)
+    cache = version_info_caches.get(keys)
+    if cache is None:
+        version_info_caches.clear()
+        cache = version_info_caches[keys] = VersionInfoCache(lambda file_path: get_file_properties(file_path, keys))
+    return cache
 
-        for blocked_app in blocked_apps:
-            keys = blocked_app.keys()
-            file_props = get_file_properties(proc_exe, keys)
-            if file_props is None:
-                continue
+def match_executable(proc_exe, blocklist, version_info_cache):
+    """Match an executable against the compiled blocklist."""
+    if not proc_exe or not blocklist:
+        return False, {}, {}
 
-            all_match = True
-            for key in keys:
-                app_value = blocked_app[key]
-                prop_value = file_props[key]
-                if not (app_value == '*' or app_value.lower() == (prop_value.lower() if prop_value else '')):
-                    all_match = False
-                    break
-
-            if all_match:
-                return True, file_props, blocked_app
-        
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-        logging.error(f"Error accessing process details: {e}")
+    # Read once per file (and cached), then looked up in the index
+    file_props = version_info_cache.get(proc_exe)
+    if file_props is None:
+        return False, {}, {}
+
+    blocked_app = blocklist.match(file_props)
+    if blocked_app is not None:
+        return True, file_props, blocked_app
     return False, {}, {}
 
-def terminate_matching_processes(blocked_apps):
-    """Terminate matching processes and log the actions."""
-    for proc in psutil.process_iter(['pid', 'exe']):
+def enforce_process(proc, create_time, blocklist, verdict_memo, proc_exe=None):
+    """Check one process against the blocklist and terminate it on a match.
+
+    Returns "allowed", "admin" or "terminated", or None if the process already
+    has a verdict under the current blocklist generation.
+    """
+    generation = blocklist.generation
+    if verdict_memo.get(proc.pid, create_time, generation) is not None:
+        return None
+    if proc_exe is None:
+        try:
+            proc_exe = proc.exe()
+        except psutil.AccessDenied:
+            proc_exe = None
+    is_match, file_props, blocked_app = match_executable(proc_exe, blocklist, version_info_cache_for(blocklist))
+    if not is_match:
+        verdict_memo.put(proc.pid, create_time, generation, "allowed")
+        return "allowed"
+    if not is_admin_process(proc):
+        proc.terminate()
+        log_message = (
+            f"Terminated process: {proc_exe} | "
+            f"Process properties: {file_props} | "
+            f"Blocked App: {blocked_app} | "
+            f"Blocklist generation: {generation}"
+        )
+        logging.info(log_message)
+        return "terminated"
+    # Logged once; an elevated process stays elevated
+    verdict_memo.put(proc.pid, create_time, generation, "admin")
+    log_message = (
+        f"Matched but not terminated (admin/system): {proc_exe} | "
+        f"Process properties: {file_props} | "
+        f"Blocked App: {blocked_app} | "
+        f"Blocklist generation: {generation}"
+    )
+    logging.info(log_message)
+    return "admin"
+
+def terminate_matching_processes(blocklist, verdict_memo):
+    """Terminate matching processes, log the actions and return the number of matches.
+
+    Processes with a verdict under the current blocklist generation are skipped.
+    """
+    matches = 0
+    live = set()
+    for proc in psutil.process_iter(['pid', 'create_time']):
         try:
-            proc_exe = proc.info['exe']
-            if proc_exe:
-                is_match, file_props, blocked_app = match_process(proc, blocked_apps)
-                if is_match:
-                    if not is_admin_process(proc):
-                        proc.terminate()
-                        log_message = (
-                            f"Terminated process: {proc_exe} | "
-                            f"Process properties: {file_props} | "
-                            f"Blocked App: {blocked_app}"
-                        )
-                        logging.info(log_message)
-                    else:
-                        log_message = (
-                            f"Matched but not terminated (admin/system): {proc_exe} | "
-                            f"Process properties: {file_props} | "
-                            f"Blocked App: {blocked_app}"
-                        )
-                        logging.info(log_message)
-                    
+            create_time = proc.info['create_time']
+            live.add((proc.pid, create_time))
+            with enforcement_lock:
+                verdict = enforce_process(proc, create_time, blocklist, verdict_memo)
+            if verdict in ("terminated", "admin"):
+                matches += 1
+            if verdict == "terminated" and create_time:
+                sweep_latencies.append(time.time() - create_time)
+
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
             logging.error(f"Error processing: {e}")
-    # Release resources
-    gc.collect()
+    with enforcement_lock:
+        verdict_memo.retain(live)
+    return matches
+
+def sweep_latency_stats():
+    latencies = list(sweep_latencies)
+    return {
+        'terminations': len(latencies),
+        'launch_to_terminate_median_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'launch_to_terminate_max_ms': max(latencies) * 1000 if latencies else None,
+    }
+
+def start_process_start_worker(scheduler, blocklist_watcher, verdict_memo):
+    """Check every started process as soon as it is reported; returns the worker, or None if unavailable."""
+    def enforce_started_process(event):
+        try:
+            proc = psutil.Process(event.pid)
+            try:
+                create_time = proc.create_time()
+            except psutil.AccessDenied:
+                create_time = None
+            with enforcement_lock:
+                verdict = enforce_process(proc, create_time, blocklist_watcher.current, verdict_memo, event.exe)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        return verdict == "terminated"
+
+    # Dropped events are picked up by the reconciliation sweep
+    worker = ProcessStartWorker(WmiProcessStartSource(), enforce_started_process, on_overflow=scheduler.wake)
+    try:
+        worker.start()
+    except Exception as e:
+        logging.error(f"Error subscribing to process start events, sweeping every {scheduler.active_interval} s: {e}")
+        return None
+    logging.info("Subscribed to process start events")
+    return worker
 
 def main():
     """Main function to run the script."""
-    blocked_apps = load_blocked_apps(csv_file_path)
+    # Reloaded in the background when BlockedApps.csv changes; each cycle and
+    # each started process use the index that is current at that moment
+    blocklist_watcher = BlocklistWatcher(csv_file_path)
+    blocklist_watcher.start()
+    logging.info(f"Compiled blocklist: {blocklist_watcher.current.stats()}")
+    verdict_memo = VerdictMemo()
+    # Started processes are checked by the worker as they appear; the sweep only
+    # reconciles (processes started before the subscription or dropped events),
+    # more often while it keeps finding blocked apps
+    scheduler = AdaptivePollScheduler(idle_interval=60, active_interval=5)
+    worker = None
+    if process_start_enforcement:
+        worker = start_process_start_worker(scheduler, blocklist_watcher, verdict_memo)
+    if worker is None:
+        scheduler.idle_interval = scheduler.active_interval = 5  # Check every 5 seconds
+    next_stats_log = time.monotonic() + 3600
     while True:
-        terminate_matching_processes(blocked_apps)
-        time.sleep(5)  # Check every 5 seconds
-        # Release resources
-        gc.collect()
+        started = time.process_time()
+        blocklist = blocklist_watcher.current
+        active = terminate_matching_processes(blocklist, verdict_memo) > 0
+        if worker and worker.source.down:
+            # The start trace is being recreated; sweep at the short interval meanwhile
+            active = True
+        scheduler.record_cycle(time.process_time() - started, active)
+        if time.monotonic() >= next_stats_log:
+            logging.info(f"Poll scheduler stats: {scheduler.stats()}")
+            logging.info(f"Version info cache stats: {version_info_cache_for(blocklist).stats()}")
+            logging.info(f"Blocklist stats: {blocklist.stats()} | reloads: {blocklist_watcher.stats()}")
+            logging.info(f"Verdict memo stats: {verdict_memo.stats()}")
+            if worker:
+                logging.info(f"Process start worker stats: {worker.stats()}")
+            logging.info(f"Sweep stats: {sweep_latency_stats()}")
+            next_stats_log = time.monotonic() + 3600
+        scheduler.wait(scheduler.next_interval(active))
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,25 @@
 import logging
-from logging.handlers import RotatingFileHandler
 import time
-import win32gui
-import win32process
 import psutil
 import winreg
-import keyboard
-import gc
 import os
+import sys
 import ctypes
 from ctypes import wintypes
+from dlp_controller import DlpController
+from dlp_logging import setup_logging
+from dlp_metrics import LoopMetrics
+from dlp_policy import PolicyWatcher, scopes
+from dlp_process_cache import ProcessInfoCache, get_session_id
+from dlp_process_events import ProcessStartEnforcer, WmiProcessStartSource
+from dlp_keyboard import LowLevelKeyboardHook
+from dlp_providers import PsutilProcessProvider
+from dlp_registry import HivePolicyApplier, RegistryReconciler, WinRegBackend, log_hive_results
+from dlp_scheduler import AdaptivePollScheduler, WatchedProcessTracker
+from dlp_sessions import NamedPipeSessionClient, NamedPipeSessionServer, SessionEngine
+from dlp_window_events import EventDrivenMonitor, WinEventHookSource, hooked_event_ranges, placement_event_ranges
+from dlp_window_snapshot import NativeWindowProvider
+from dlp_window_state import WindowStateTable
 
 # Constants for accessing user sessions
 WTS_CURRENT_SERVER_HANDLE = 0
@@ -35,17 +45,29 @@ WTSFreeMemory = wtsapi32.WTSFreeMemory
 
 WTS_CURRENT_SESSION = WTSGetActiveConsoleSessionId()
 
-# Setup logging
-log_file_path = 'C:\\Temp\\PCeng\\SVSDLPControl.log'
-log_dir = os.path.dirname(log_file_path)
-
-# Create the directory if it doesn't exist
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+# On RDS/Citrix hosts one engine (--session-engine) decides and enforces per
+# session, and a helper (--session-helper) runs in every interactive session
+multi_session_mode = "--session-engine" in sys.argv
+session_helper_mode = "--session-helper" in sys.argv
+
+# Log, policy and metrics files per scope. main(scope="all_programs")
+# (SVSDLPControl_AllPrograms.py, or --all-programs) checks other_keywords against
+# the windows of every process, not only browsers and specific_programs; it keeps
+# the log file the separate all-programs script always wrote.
+log_file_paths = {
+    "targeted": 'C:\\Temp\\PCeng\\SVSDLPControl.log',
+    "all_programs": 'C:\\Windows\\SVSDLPControl.log',
+}
+policy_file_paths = {
+    "targeted": r"C:\Program Files\OCBC\OCBCDLP\SVSDLPPolicy.json",
+    "all_programs": r"C:\Program Files\OCBC\OCBCDLP\SVSDLPPolicy_AllPrograms.json",
+}
+metrics_file_paths = {
+    "targeted": 'C:\\Temp\\PCeng\\SVSDLPMetrics.prom',
+    "all_programs": 'C:\\Temp\\PCeng\\SVSDLPMetrics_AllPrograms.prom',
+}
 
-# Configure the rotating file handler to keep only 2 log files with max size 5MB each
-handler = RotatingFileHandler(log_file_path, maxBytes=5*1024*1024, backupCount=1)
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[handler])
+# Logging is set up by configure() once the scope is known
 logger = logging.getLogger(__name__)
 
 # Registry paths and values
@@ -67,6 +89,21 @@ screensketch_value_data = "ScreenSketch.exe"
 print_screen_key_value_name = "PrintScreenKeyForSnippingEnabled"
 print_screen_key_value_data = 0  # Value data is DWORD 0
 
+# Default values written under DisallowRun while blocking is active
+disallow_run_values = {
+    snipping_tool_value_name: snipping_tool_value_data,
+    steps_recorder_value_name: steps_recorder_value_data,
+    osk_value_name: osk_value_data,
+    screen_clipping_host_value_name: screen_clipping_host_value_data,
+    screensketch_value_name: screensketch_value_data
+}
+
+# Desired per-user policy state; values are written only when a hive drifts from it
+hive_applier = HivePolicyApplier(WinRegBackend())
+registry_reconciler = RegistryReconciler(hive_applier)
+registry_reconciler.set_value(explorer_policy_path, disallow_run_value_name, disallow_run_value_data, winreg.REG_DWORD)
+registry_reconciler.set_value(keyboard_policy_path, print_screen_key_value_name, print_screen_key_value_data, winreg.REG_DWORD)
+
 # Keywords to check for
 browser_keywords = {
     "msedge.exe": [
@@ -106,111 +143,56 @@ other_keywords = [
 # Programs to check
 specific_programs = ["javaw.exe", "javaws.exe", "queuesvr.exe", "sb_twprc.exe", "java.exe", "sp_logon.dll"]
 
-# Flag to indicate if the Print Screen key should be blocked
-block_print_screen = False
-
-def on_print_screen(event):
-    global block_print_screen
-    if block_print_screen and event.event_type == 'down':
-        return False  # Block the key press
-
-def install_keyboard_hooks():
-    try:
-        keyboard.hook_key('print screen', on_print_screen, suppress=True)
-        logger.info("Installed Print Screen key hook")
-    except Exception as e:
-        logger.error(f"Error installing keyboard hooks: {e}")
-
-def uninstall_keyboard_hooks():
-    try:
-        keyboard.unhook_all()
-        logger.info("Uninstalled all keyboard hooks")
-    except Exception as e:
-        logger.error(f"Error uninstalling keyboard hooks: {e}")
-
-def get_all_window_titles():
-    titles = []
-
-    def enum_window_callback(hwnd, _):
-        if win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd):
-            title = win32gui.GetWindowText(hwnd)
-            if title:
-                titles.append((hwnd, title.strip()))
-
-    win32gui.EnumWindows(enum_window_callback, None)
-    return titles
-
-def get_process_info(hwnd):
-    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-    try:
-        process = psutil.Process(pid)
-        return process.name().lower(), pid  # Make process name lowercase
-    except psutil.NoSuchProcess:
-        return None, None
-
-def is_window_minimized(hwnd):
-    return win32gui.IsIconic(hwnd)
-
-def set_registry_value_for_all_users_hku(key, value_name, value_data, value_type):
-    log_messages = []
-    try:
-        hku = winreg.HKEY_USERS
-        with winreg.OpenKey(hku, "") as hku_key:
-            for i in range(0, winreg.QueryInfoKey(hku_key)[0]):
-                sid = winreg.EnumKey(hku_key, i)
-                try:
-                    with winreg.CreateKeyEx(winreg.HKEY_USERS, f"{sid}\\{key}", 0, winreg.KEY_ALL_ACCESS) as reg_key:
-                        winreg.SetValueEx(reg_key, value_name, 0, value_type, value_data)
-                        log_messages.append(f"{sid}")
-                except Exception as e:
-                    log_messages.append(f"{sid} error: {e}")
-        if log_messages:
-            logger.info(f"Set registry value {value_name} for users: {', '.join(log_messages)}")
-    except Exception as e:
-        logger.error(f"Error accessing HKEY_USERS: {e}")
-
-def set_registry_values_for_all_users_hku(key, values):
-    log_messages = []
-    try:
-        hku = winreg.HKEY_USERS
-        with winreg.OpenKey(hku, "") as hku_key:
-            for i in range(0, winreg.QueryInfoKey(hku_key)[0]):
-                sid = winreg.EnumKey(hku_key, i)
-                try:
-                    with winreg.CreateKeyEx(winreg.HKEY_USERS, f"{sid}\\{key}", 0, winreg.KEY_ALL_ACCESS) as reg_key:
-                        for value_name, value_data in values.items():
-                            winreg.SetValueEx(reg_key, value_name, 0, winreg.REG_SZ, value_data)
-                        log_messages.append(f"{sid}")
-                except Exception as e:
-                    log_messages.append(f"{sid} error: {e}")
-        if log_messages:
-            logger.info(f"Set registry values for users: {', '.join(log_messages)}")
-    except Exception as e:
-        logger.error(f"Error accessing HKEY_USERS: {e}")
+# Shell hosts skipped in the all-programs scope; their windows ("Search", "Start")
+# never show sensitive data but would match other_keywords
+ignored_programs = ["searchhost.exe", "searchapp.exe", "shellexperiencehost.exe",
+                    "startmenuexperiencehost.exe", "textinputhost.exe"]
+
+# Live desktop providers behind the platform-independent controller
+process_cache = ProcessInfoCache()
+# "on_screen" does not block for sensitive windows that cannot be captured
+# (minimized, on another virtual desktop, off every monitor); placement is only
+# read for windows whose title matched. "all" blocks for every sensitive window
+window_filter = "on_screen"
+window_provider = NativeWindowProvider(window_filter=window_filter)
+process_provider = PsutilProcessProvider(process_cache)
+# Installed once at startup; blocking only flips its enable flag
+keyboard_provider = LowLevelKeyboardHook()
+
+# Policy watcher, loop metrics and controller of the scope main() runs with; built by configure()
+policy_watcher = None
+loop_metrics = None
+controller = None
+
+# React to window events instead of waiting for the next 5 second enumeration
+event_driven_monitoring = True
+
+# Polling mode: enumerate rarely while none of the watched programs runs and
+# sub-second while one does or a block is active; a watched process start
+# wakes the loop at once. Presence is re-read from a full process sweep every
+# watched_refresh_interval seconds, or every cycle without start notifications.
+poll_scheduler = AdaptivePollScheduler(idle_interval=15, active_interval=0.5)
+watched_processes = WatchedProcessTracker()
+watched_policy = None
+watched_refresh_interval = 300
+next_watched_refresh = 0
+# Seconds between a start event's timestamp and the process creation time
+# beyond which the pid was reused by a later process, which is not killed
+pid_reuse_slack = 1.0
+
+# Per-session block state on terminal servers
+session_engine = None
+session_helper_interval = 2
+session_timeout = 60
 
 def remove_registry_values_for_all_users_hku(key, value_names):
-    log_messages = []
     try:
-        hku = winreg.HKEY_USERS
-        with winreg.OpenKey(hku, "") as hku_key:
-            for i in range(0, winreg.QueryInfoKey(hku_key)[0]):
-                sid = winreg.EnumKey(hku_key, i)
-                try:
-                    with winreg.OpenKey(winreg.HKEY_USERS, f"{sid}\\{key}", 0, winreg.KEY_ALL_ACCESS) as reg_key:
-                        for value_name in value_names:
-                            try:
-                                winreg.DeleteValue(reg_key, value_name)
-                                log_messages.append(f"{sid}")
-                            except FileNotFoundError:
-                                continue
-                            except PermissionError:
-                                logger.error(f"{sid} access denied")
-                except Exception as e:
-                    logger.error(f"{sid} error: {e}")
-        if log_messages:
-            logger.info(f"Removed registry values for users: {', '.join(log_messages)}")
+        results = hive_applier.apply(key, remove=value_names)
     except Exception as e:
         logger.error(f"Error accessing HKEY_USERS: {e}")
+        return {}
+    log_hive_results("Removed registry values", results)
+    return results
 
 def remove_specific_registry_values():
     value_names_to_remove = [
@@ -223,166 +205,309 @@ def remove_specific_registry_values():
     ]
     remove_registry_values_for_all_users_hku(disallow_run_key_path, value_names_to_remove)
 
-def ensure_print_screen_key_setting():
+def kill_started_process(pid, name, created):
+    info = process_cache.lookup(pid)
+    if info is None:
+        raise psutil.NoSuchProcess(pid, name)
+    # The event may be handled late; a process created after it reused the pid
+    if info.create_time is not None and info.create_time > created + pid_reuse_slack:
+        raise psutil.NoSuchProcess(pid, name, f"PID {pid} was reused by {info.name} after the start event")
+    process_provider.kill(info)
+    logger.info(f"Killed {name} with PID {pid} on process start")
+
+def process_name_of(pid):
+    # Win32_ProcessStartTrace names are truncated kernel image names
     try:
-        hku = winreg.HKEY_USERS
-        with winreg.OpenKey(hku, "") as hku_key:
-            for i in range(0, winreg.QueryInfoKey(hku_key)[0]):
-                sid = winreg.EnumKey(hku_key, i)
-                try:
-                    with winreg.CreateKeyEx(winreg.HKEY_USERS, f"{sid}\\{keyboard_policy_path}", 0, winreg.KEY_ALL_ACCESS) as reg_key:
-                        winreg.SetValueEx(reg_key, print_screen_key_value_name, 0, winreg.REG_DWORD, print_screen_key_value_data)
-                except Exception as e:
-                    pass
-    except Exception as e:
-        pass
-
-def kill_existing_instances(process_names):
-    for process in psutil.process_iter(['name']):
-        if process.info['name'].lower() in process_names:
-            try:
-                process.kill()
-                logger.info(f"Killed {process.info['name']} with PID {process.pid}")
-            except Exception as e:
-                logger.error(f"Error killing process {process.info['name']}: {e}")
-
-def block_apps():
-    global block_print_screen
-    values_to_set = {
-        snipping_tool_value_name: snipping_tool_value_data,
-        steps_recorder_value_name: steps_recorder_value_data,
-        osk_value_name: osk_value_data,
-        screen_clipping_host_value_name: screen_clipping_host_value_data,
-        screensketch_value_name: screensketch_value_data
-    }
-    set_registry_values_for_all_users_hku(disallow_run_key_path, values_to_set)
-    kill_existing_instances([
-        snipping_tool_value_data.lower(), 
-        steps_recorder_value_data.lower(), 
-        osk_value_data.lower(), 
-        screen_clipping_host_value_data.lower(),
-        screensketch_value_data.lower()
-    ])
-    logger.info("Applications have been blocked and existing instances killed.")
-    install_keyboard_hooks()
-    block_print_screen = True
-    logger.info("Print Screen key has been disabled.")
-
-def unblock_apps():
-    global block_print_screen
-    value_names_to_remove = [
-        snipping_tool_value_name, 
-        steps_recorder_value_name, 
-        osk_value_name, 
-        screen_clipping_host_value_name,
-        screensketch_value_name
-    ]
-    remove_registry_values_for_all_users_hku(disallow_run_key_path, value_names_to_remove)
-    logger.info("Applications have been unblocked.")
-    block_print_screen = False
-    uninstall_keyboard_hooks()
-    logger.info("Print Screen key has been enabled.")
-
-def check_and_update_registry(block_required):
-    values_to_set = {
-        snipping_tool_value_name: snipping_tool_value_data,
-        steps_recorder_value_name: steps_recorder_value_data,
-        osk_value_name: osk_value_data,
-        screen_clipping_host_value_name: screen_clipping_host_value_data,
-        screensketch_value_name: screensketch_value_data
-    }
-    value_names_to_remove = [
-        snipping_tool_value_name, 
-        steps_recorder_value_name, 
-        osk_value_name, 
-        screen_clipping_host_value_name,
-        screensketch_value_name
-    ]
+        return psutil.Process(pid).name().lower()
+    except psutil.Error:
+        return None
+
+def in_blocked_session(pid):
+    return get_session_id(pid) in session_engine.blocked_sessions()
+
+def watched_process_started(event):
+    if watched_processes.started(event.pid, event.name):
+        poll_scheduler.wake()
 
-    if block_required:
-        set_registry_values_for_all_users_hku(disallow_run_key_path, values_to_set)
+def start_process_start_enforcer():
+    enforcer = ProcessStartEnforcer(WmiProcessStartSource(), controller.active_policy.blocked_tool_names,
+                                    kill_started_process, pid_filter=in_blocked_session if multi_session_mode else None,
+                                    on_start=watched_process_started, resolve_name=process_name_of)
+    try:
+        enforcer.start()
+    except Exception as e:
+        logger.error(f"Error subscribing to process start events, using periodic sweeps: {e}")
+        return
+    enforcer.enabled = controller.block_print_screen
+    controller.process_start_enforcer = enforcer
+    logger.info("Subscribed to process start events")
+
+def update_watched_processes():
+    global watched_policy, next_watched_refresh
+    if watched_policy is not controller.active_policy:
+        watched_policy = controller.active_policy
+        watched_processes.set_names(name for name, matcher in watched_policy.keyword_matchers.items() if matcher)
+        next_watched_refresh = 0
+    now = time.monotonic()
+    if not controller.process_start_enforcer or now >= next_watched_refresh:
+        watched_processes.refresh(process_provider.iter_processes())
+        next_watched_refresh = now + watched_refresh_interval
     else:
-        remove_registry_values_for_all_users_hku(disallow_run_key_path, value_names_to_remove)
+        watched_processes.prune(psutil.pid_exists)
 
 def prevent_new_instances():
-    block_state_logged = None
-
     while True:
+        started = time.process_time()
+        active = True
         try:
-            window_titles = get_all_window_titles()
-            block_required = False
-            detected_by = None
-
-            for hwnd, title in window_titles:
-                process_name, pid = get_process_info(hwnd)
-                minimized = is_window_minimized(hwnd)
-                if process_name in browser_keywords:
-                    for keyword in browser_keywords[process_name]:
-                        if keyword.lower() in title.lower():
-                            if minimized:
-                                logger.info(f"Process {process_name} (PID: {pid}) with keyword {keyword} is minimized, skipping")
-                                continue
-                            block_required = True
-                            detected_by = (process_name, pid, keyword)
-                            logger.info(f"Blocking required by process {process_name} (PID: {pid}) with keyword: {keyword}")
-                            break
-                elif process_name in specific_programs:
-                    for keyword in other_keywords:
-                        if keyword.lower() in title.lower():
-                            if minimized:
-                                logger.info(f"Process {process_name} (PID: {pid}) with keyword in title {keyword} is minimized, skipping")
-                                continue
-                            block_required = True
-                            detected_by = (process_name, pid, keyword)
-                            logger.info(f"Blocking required by process {process_name} (PID: {pid}) with keyword in title: {keyword}")
-                            break
-
-            if block_required:
-                if not block_print_screen:
-                    block_apps()
-                    logger.info(f"Blocking triggered by process {detected_by[0]} (PID: {detected_by[1]}) with keyword: {detected_by[2]}")
-                # Continuously kill instances of the controlled apps
-                kill_existing_instances([
-                    snipping_tool_value_data.lower(), 
-                    steps_recorder_value_data.lower(), 
-                    osk_value_data.lower(), 
-                    screen_clipping_host_value_data.lower(),
-                    screensketch_value_data.lower()
-                ])
-            else:
-                if block_print_screen:
-                    unblock_apps()
+            controller.run_cycle()
+            update_watched_processes()
+            active = watched_processes.present or controller.block_print_screen
 
-            # Check and update registry values only if the block state has changed
-            if block_state_logged != block_print_screen:
-                check_and_update_registry(block_print_screen)
-                block_state_logged = block_print_screen
+        except Exception as e:
+            logger.error(f"An error occurred: {e}")
+
+        poll_scheduler.record_cycle(time.process_time() - started, active)
+        interval = poll_scheduler.next_interval(active)
+        loop_metrics.observe("poll_interval", interval)
+        poll_scheduler.wait(interval)
+
+def prevent_new_instances_event_driven(source):
+    # Window events drive the block decision; the 5 second cycle only resyncs
+    # against a full enumeration and performs the periodic enforcement.
+    monitor = EventDrivenMonitor(source, controller.window_table, window_provider.snapshot,
+                                 controller.apply_block_state)
+    next_cycle = 0
 
-            # Ensure the Print Screen key registry setting is always set
-            ensure_print_screen_key_setting()
+    while True:
+        try:
+            now = time.monotonic()
+            if now >= next_cycle:
+                controller.run_resync_cycle(monitor)
+                next_cycle = now + 5
+                if source.dropped:
+                    logger.warning(f"Window event queue overflowed, {source.dropped} events dropped")
+                    source.dropped = 0
 
-            # Force garbage collection to release memory
-            gc.collect()
+            monitor.process_pending(next_cycle - time.monotonic())
+
+        except Exception as e:
+            logger.error(f"An error occurred: {e}")
+            time.sleep(1)
+
+def evaluate_session_window(state, hwnd, record):
+    # Helpers report pids from their own desktop; anything outside the session is ignored
+    info = process_cache.lookup(record.pid)
+    if info is None or info.session_id != state.session_id:
+        return None
+    return controller.evaluate_window(hwnd, record)
+
+def apply_session_block_state(state):
+    """Write or remove DisallowRun in the session user's hive and kill tools in that session only."""
+    policy = controller.active_policy
+    for value_name, value_data in policy.blocked_tools.items():
+        if state.block_required:
+            registry_reconciler.set_hive_value(state.user_sid, disallow_run_key_path, value_name, value_data, winreg.REG_SZ)
+        else:
+            registry_reconciler.remove_hive_value(state.user_sid, disallow_run_key_path, value_name)
+    controller.reconcile_registry()
+    if state.session_id not in session_engine.sessions:
+        # Signed off; the hive falls back to the shared desired state
+        registry_reconciler.clear_hive(state.user_sid)
+
+    if state.block_required:
+        controller.kill_existing_instances(policy.blocked_tool_names, {state.session_id})
+        detected_by = state.detected_by
+        logger.info(f"Blocking session {state.session_id} ({state.user_sid}), triggered by process "
+                    f"{detected_by[0]} (PID: {detected_by[1]}) with keyword: {detected_by[2]}")
+    else:
+        logger.info(f"Unblocked session {state.session_id} ({state.user_sid})")
+    if controller.process_start_enforcer:
+        controller.process_start_enforcer.enabled = bool(session_engine.blocked_sessions())
+
+def release_session_hive(state):
+    # Signed off: close the registry watches so the profile service can unload the hive
+    registry_reconciler.release_hive(state.user_sid)
+
+def reapply_session_policies():
+    # Tool lists may have changed: rebuild the per-hive values of blocked sessions
+    for state in list(session_engine.sessions.values()):
+        registry_reconciler.clear_hive(state.user_sid)
+        if state.block_required:
+            apply_session_block_state(state)
+    session_engine.reevaluate()
+
+def enforce_session_block_state():
+    session_engine.expire(session_timeout)
+    blocked_sessions = session_engine.blocked_sessions()
+    now = time.monotonic()
+    if blocked_sessions and controller.safety_sweep_due(now):
+        killed = controller.kill_existing_instances(controller.active_policy.blocked_tool_names, blocked_sessions)
+        controller.record_safety_sweep(now, killed)
+    controller.reconcile_registry()
+    controller.log_periodic_stats()
+
+def run_session_engine():
+    """Serve the session helpers and keep each session's enforcement in line with its state."""
+    server = NamedPipeSessionServer(session_engine)
+    server.start()
+    logger.info("Session engine listening for helpers")
 
+    while True:
+        try:
+            # Helper connections apply block changes from their own threads
+            with session_engine.lock:
+                if controller.refresh_policy():
+                    reapply_session_policies()
+                mark = controller.timing_mark()
+                enforce_session_block_state()
+                controller.add_phase("enforce", mark)
+                controller.end_metrics_cycle()
         except Exception as e:
             logger.error(f"An error occurred: {e}")
 
-        # Check every 5 seconds
         time.sleep(5)
 
-def main():
-    logger.info("Script started.")
-    
-    # Set DisallowRun value for all users at the beginning
-    set_registry_value_for_all_users_hku(explorer_policy_path, disallow_run_value_name, disallow_run_value_data, winreg.REG_DWORD)
+def set_session_block(block_required):
+    if block_required and not controller.block_print_screen:
+        keyboard_provider.enable()
+        controller.block_print_screen = True
+        logger.info("Print Screen key has been disabled for this session.")
+    elif not block_required and controller.block_print_screen:
+        keyboard_provider.disable()
+        controller.block_print_screen = False
+        logger.info("Print Screen key has been enabled for this session.")
+
+def start_keyboard_hook():
+    try:
+        keyboard_provider.start()
+        logger.info("Installed low-level keyboard hook for screen capture keys")
+    except Exception as e:
+        logger.error(f"Error installing keyboard hook: {e}")
+
+def run_session_helper():
+    """Report this session's windows to the engine and own the session's Print Screen hook."""
+    start_keyboard_hook()
+    client = NamedPipeSessionClient()
+    # The helper only tracks changes; the engine evaluates
+    window_table = WindowStateTable(lambda hwnd, record: None)
+    connected = False
+
+    while True:
+        try:
+            if not connected:
+                client.connect()
+                connected = True
+                window_table.clear()
+                logger.info("Connected to the session engine")
+            if window_provider.scan(window_table):
+                windows = [[hwnd, record.title, record.pid, record.minimized]
+                           for hwnd, record in window_table.windows.items() if record.visible]
+                reply = client.request({"op": "windows", "windows": windows})
+            else:
+                reply = client.request({"op": "heartbeat"})
+            set_session_block(reply.get("block"))
+        except Exception as e:
+            # Keep the current hook state until the engine is reachable again
+            if connected:
+                logger.error(f"Lost connection to the session engine: {e}")
+            client.close()
+            connected = False
+
+        time.sleep(session_helper_interval)
+
+def configure(scope):
+    """Set up logging, the policy watcher, metrics and controller for scope ("targeted" or "all_programs")."""
+    global policy_watcher, loop_metrics, controller
+    if scope not in scopes:
+        raise ValueError(f"scope must be one of {', '.join(scopes)}")
+
+    log_file_path = log_file_paths[scope]
+    log_dir = os.path.dirname(log_file_path)
+    if session_helper_mode:
+        # Helpers run as the signed-in user, one per session
+        log_dir = os.environ.get('TEMP', log_dir)
+        log_file_path = os.path.join(log_dir, 'SVSDLPHelper.log')
+
+    # Create the directory if it doesn't exist
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    # Queue log records to a background writer; keep the current file plus 1 compressed 5MB segment
+    setup_logging(log_file_path, backup_count=1)
+
+    # External policy file; the constants above are the defaults for any key it leaves out.
+    # It is recompiled on change in the background and picked up between cycles.
+    policy_watcher = PolicyWatcher(policy_file_paths[scope], {
+        "browser_keywords": browser_keywords,
+        "specific_programs": specific_programs,
+        "other_keywords": other_keywords,
+        "blocked_tools": disallow_run_values,
+        "scope": scope,
+        "ignored_programs": ignored_programs,
+    })
+
+    # Per-phase cycle timings and the first-seen-to-block latency, exported for scraping
+    loop_metrics = LoopMetrics(("enumerate", "resolve", "match", "enforce", "registry"),
+                               latencies=("detection_to_block", "poll_interval"), path=metrics_file_paths[scope])
+
+    # Blocked tools are killed as soon as they start; the full process sweep is a safety net
+    # that runs every cycle until the start stream has killed a real start, then every 60 s
+    controller = DlpController(window_provider, process_provider, keyboard_provider, registry_reconciler,
+                               policy_watcher, disallow_run_key_path, loop_metrics, safety_sweep_interval=60)
+    controller.scheduler = poll_scheduler
+    if scope == "all_programs":
+        # Any process may open a sensitive window, so idle polling keeps the old 5 second cycle
+        poll_scheduler.idle_interval = 5
+
+def main(scope="targeted"):
+    global session_engine
+    configure(scope)
+    if session_helper_mode:
+        logger.info("Session helper started.")
+        run_session_helper()
+        return
+
+    logger.info(f"Script started ({scope} scope).")
     
-    # Ensure the Print Screen key registry setting is always set
-    ensure_print_screen_key_setting()
+    # Load the external policy file and keep watching it for changes
+    policy_watcher.start()
+    controller.refresh_policy()
     
     # Remove specific registry values if they exist
     remove_specific_registry_values()
     
+    # Set DisallowRun and the Print Screen key setting for all users at the beginning
+    controller.check_and_update_registry(False)
+    
+    if multi_session_mode:
+        session_engine = SessionEngine(evaluate_session_window, apply_session_block_state, release_session_hive)
+        controller.session_engine = session_engine
+
+    start_process_start_enforcer()
+
+    if multi_session_mode:
+        run_session_engine()
+        return
+
+    start_keyboard_hook()
+
+    if event_driven_monitoring:
+        event_ranges = hooked_event_ranges
+        if window_filter != "all":
+            # Pruned sensitive windows must be re-evaluated as soon as they move or uncloak into view
+            event_ranges = hooked_event_ranges + placement_event_ranges
+        source = WinEventHookSource(event_ranges=event_ranges)
+        try:
+            source.start()
+        except Exception as e:
+            logger.error(f"Error installing window event hooks, falling back to polling: {e}")
+        else:
+            logger.info("Installed window event hooks")
+            prevent_new_instances_event_driven(source)
+            return
+
     prevent_new_instances()
 
 if __name__ == "__main__":
-    main()
+    main(scope="all_programs" if "--all-programs" in sys.argv else "targeted")
\ No newline at end of file
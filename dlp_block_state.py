@@ -0,0 +1,60 @@
+"""Hysteresis between the raw block trigger and the enforced block state.
+
+Switching tabs or alt-tabbing past a sensitive window flips the raw trigger
+(some window requires blocking) from one cycle to the next. Every enforced
+transition costs a registry rewrite for all hives, a process sweep and a
+keyboard toggle, so BlockHysteresis blocks as soon as the trigger appears but
+releases the block only after the trigger has been absent for hold_down
+seconds and the block has been in force for at least min_dwell seconds.
+"""
+import time
+
+
+class BlockHysteresis:
+    """Enforced block state derived from the raw trigger with hold-down and dwell timers."""
+
+    def __init__(self, hold_down=15.0, min_dwell=30.0, clock=time.monotonic):
+        self.hold_down = hold_down
+        self.min_dwell = min_dwell
+        self.clock = clock
+        self.trigger = False
+        self.blocked = False
+        self.blocked_since = None
+        self.last_trigger = None
+        self.trigger_changes = 0
+        self.blocks = 0
+        self.unblocks = 0
+
+    def update(self, trigger):
+        """Feed the current raw trigger; returns whether blocking must be enforced."""
+        now = self.clock()
+        if trigger != self.trigger:
+            self.trigger_changes += 1
+        if trigger or self.trigger:
+            # The trigger was present until now
+            self.last_trigger = now
+        self.trigger = trigger
+
+        if trigger:
+            if not self.blocked:
+                self.blocked = True
+                self.blocked_since = now
+                self.blocks += 1
+        elif self.blocked and now - self.last_trigger >= self.hold_down and now - self.blocked_since >= self.min_dwell:
+            self.blocked = False
+            self.unblocks += 1
+        return self.blocked
+
+    @property
+    def release_pending(self):
+        return self.blocked and not self.trigger
+
+    def stats(self):
+        transitions = self.blocks + self.unblocks
+        return {
+            'trigger_changes': self.trigger_changes,
+            'transitions': transitions,
+            'avoided_transitions': max(self.trigger_changes - transitions, 0),
+            'blocked': self.blocked,
+            'release_pending': self.release_pending,
+        }
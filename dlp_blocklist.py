@@ -0,0 +1,304 @@
+"""Compiled BlockedApps.csv index for AppControl.
+
+Each CSV row lists file properties that must all match, case-insensitively,
+with '*' matching anything. BlocklistIndex files every row under its first
+exact value among the selective fields (OriginalFilename, ProductName,
+CompanyName, then any other column except Type) in a hash map of lowercased
+values; rows that are wildcards on all of them form the small residual set.
+A process is matched by one lookup per indexed column plus a check of the
+residual rules, and each candidate is
+verified against all of its fields, so the cost no longer grows with the
+number of rows. Among several matching rows the first in CSV order wins, as
+with the linear scan.
+
+BlocklistWatcher reloads the CSV when its mtime or size changes, compiles
+the new index on its own thread and swaps it in with a single reference
+assignment, so enforcement keeps using the previous index until the new one
+is complete. Each index carries a generation that verdicts record.
+"""
+import csv
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+selective_fields = ("OriginalFilename", "ProductName", "CompanyName")
+# Columns shared by most rows; an index on them would not narrow anything
+unselective_fields = ("Type",)
+
+
+class BlocklistIndex:
+    """Hash index over blocklist rows with a residual set for wildcard rows.
+
+    generation numbers successive blocklists so verdicts reached under an
+    older one can be told apart.
+    """
+
+    def __init__(self, rows, generation=0):
+        started = time.perf_counter()
+        self.generation = generation
+        self.rows = list(rows)
+        self.keys = [key for key in self.rows[0] if key is not None] if self.rows else []
+        fields = list(selective_fields) + [key for key in self.keys
+                                           if key not in selective_fields and key not in unselective_fields]
+        self.index = {field: {} for field in fields}
+        self.residual = []
+        for position, row in enumerate(self.rows):
+            # (position, row, ((key, lowercased value), ...)) with wildcard fields left out
+            rule = (position, row, tuple((key, value.lower()) for key, value in row.items()
+                                         if key is not None and value != '*'))
+            field = next((field for field in fields if row.get(field, '*') != '*'), None)
+            if field is None:
+                self.residual.append(rule)
+            else:
+                self.index[field].setdefault(row[field].lower(), []).append(rule)
+        self.lookups = 0
+        self.candidates = 0
+        self.matches = 0
+        self.compile_seconds = time.perf_counter() - started
+
+    def __len__(self):
+        return len(self.rows)
+
+    def match(self, props):
+        """Return the first row (in CSV order) matching the file properties, or None."""
+        self.lookups += 1
+        folded = {key: value.lower() if value else '' for key, value in props.items()}
+        best = None
+        for field, buckets in self.index.items():
+            best = self._verify(buckets.get(folded.get(field, '')), folded, best)
+        best = self._verify(self.residual, folded, best)
+        if best is None:
+            return None
+        self.matches += 1
+        return best[1]
+
+    def _verify(self, rules, folded, best):
+        if not rules:
+            return best
+        for rule in rules:
+            if best is not None and rule[0] > best[0]:
+                # Rules are in CSV order; later ones cannot win
+                break
+            self.candidates += 1
+            if all(folded.get(key, '') == value for key, value in rule[2]):
+                return rule
+        return best
+
+    def stats(self):
+        buckets = [len(rules) for field_index in self.index.values() for rules in field_index.values()]
+        return {
+            'generation': self.generation,
+            'rows': len(self.rows),
+            'indexed': {field: sum(map(len, field_index.values())) for field, field_index in self.index.items()
+                        if field_index},
+            'residual': len(self.residual),
+            'buckets': len(buckets),
+            'largest_bucket': max(buckets, default=0),
+            'lookups': self.lookups,
+            'matches': self.matches,
+            'candidates_per_lookup': self.candidates / self.lookups if self.lookups else 0.0,
+            'compile_ms': self.compile_seconds * 1000,
+        }
+
+
+def load_blocked_apps(csv_file_path):
+    """Load the list of blocked apps from the CSV file."""
+    blocked_apps = []
+    with open(csv_file_path, mode='r') as file:
+        csv_reader = csv.DictReader(file)
+        for row in csv_reader:
+            if all(row[key] for key in row):  # Skip rows with missing values
+                blocked_apps.append(row)
+    return blocked_apps
+
+
+class BlocklistWatcher:
+    """Recompile the blocklist when the CSV's mtime or size changes.
+
+    current always holds a complete BlocklistIndex; readers take the
+    reference once per check and never see a partially built one. A file
+    that fails to load leaves the previous index in force.
+    """
+
+    def __init__(self, path, interval=5.0, loader=load_blocked_apps):
+        self.path = path
+        self.interval = interval
+        self.loader = loader
+        self.current = BlocklistIndex([])
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload_seconds = None
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reload if the file changed since the last check; returns True on a swap."""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is None:
+            logger.warning(f"Blocklist {self.path} not found, keeping generation {self.current.generation}")
+            return False
+        return self.reload()
+
+    def reload(self):
+        started = time.perf_counter()
+        try:
+            blocklist = BlocklistIndex(self.loader(self.path), self.current.generation + 1)
+        except (OSError, ValueError, csv.Error) as e:
+            self.failures += 1
+            logger.error(f"Error loading blocklist {self.path}, keeping generation "
+                         f"{self.current.generation}: {e}")
+            return False
+        self.current = blocklist
+        self.reloads += 1
+        self.last_reload_seconds = time.perf_counter() - started
+        logger.info(f"Loaded blocklist generation {blocklist.generation} ({len(blocklist)} rows) from "
+                    f"{self.path} in {self.last_reload_seconds * 1000:.1f} ms")
+        return True
+
+    def start(self):
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="BlocklistWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'generation': self.current.generation,
+            'rows': len(self.current),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_reload_ms': self.last_reload_seconds * 1000 if self.last_reload_seconds is not None else None,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking blocklist {self.path}: {e}")
+
+
+def linear_match(rows, props):
+    """The row-by-row scan BlocklistIndex replaces; kept for the benchmark."""
+    for row in rows:
+        if all(row[key] == '*' or row[key].lower() == (props[key].lower() if props[key] else '')
+               for key in row):
+            return row
+    return None
+
+
+def synthetic_rows(count, seed=13):
+    """Blocklist rows shaped like BlockedApps.csv; about 2% only name a FileDescription."""
+    import random
+
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            rows.append({"OriginalFilename": "*", "ProductName": "*", "CompanyName": "*",
+                         "FileDescription": f"Screen recorder {i}", "Type": "Application"})
+        elif roll < 0.2:
+            rows.append({"OriginalFilename": "*", "ProductName": f"Product {i}", "CompanyName": f"Vendor {i % 97}",
+                         "FileDescription": "*", "Type": "Application"})
+        else:
+            rows.append({"OriginalFilename": f"Tool{i}.exe", "ProductName": rng.choice(["*", f"Product {i}"]),
+                         "CompanyName": rng.choice(["*", f"Vendor {i % 97}"]), "FileDescription": "*",
+                         "Type": "Application"})
+    return rows
+
+
+def run_benchmark(row_counts=(100, 1000, 10000), process_count=300, seed=17):
+    """Matching cost for 300 processes as BlockedApps.csv grows, index vs linear scan."""
+    import random
+
+    rng = random.Random(seed)
+    processes = []
+    for i in range(process_count):
+        # Mostly ordinary software, a few blocked tools
+        index = rng.randrange(100) if i % 50 == 0 else 100000 + i
+        processes.append({"OriginalFilename": f"TOOL{index}.EXE", "ProductName": f"Product {index}",
+                          "CompanyName": f"Vendor {index % 97}", "FileDescription": "Some application",
+                          "Type": "Application"})
+
+    for count in row_counts:
+        rows = synthetic_rows(count)
+        blocklist = BlocklistIndex(rows)
+        timings = {}
+        for name, match in (("linear", lambda props: linear_match(rows, props)), ("index", blocklist.match)):
+            started = time.perf_counter()
+            results = [match(props) for props in processes]
+            timings[name] = (time.perf_counter() - started, sum(result is not None for result in results))
+        assert [linear_match(rows, props) for props in processes] == [blocklist.match(props) for props in processes]
+        stats = blocklist.stats()
+        print(f"rows {count:>6}: linear {timings['linear'][0] * 1000:8.2f} ms, "
+              f"index {timings['index'][0] * 1000:6.2f} ms per {process_count} processes "
+              f"({timings['index'][1]} matches), compile {stats['compile_ms']:.1f} ms, "
+              f"residual {stats['residual']}, {stats['candidates_per_lookup']:.2f} candidates per lookup")
+
+
+def run_reload_benchmark(row_count=10000, process_count=300):
+    """Reload time of a row_count-row CSV and the matching stalls while it runs in the background."""
+    import tempfile
+
+    processes = [{"OriginalFilename": f"app{i}.exe", "ProductName": f"Product {i}", "CompanyName": "Vendor",
+                  "FileDescription": "", "Type": "Application"} for i in range(process_count)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "BlockedApps.csv")
+        for generation, count in enumerate((row_count, row_count + 1)):
+            rows = synthetic_rows(count)
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            if generation == 0:
+                watcher = BlocklistWatcher(path)
+                watcher.check()
+                print(f"initial load of {row_count} rows: {watcher.last_reload_seconds * 1000:.1f} ms")
+                continue
+            # Enforcement keeps matching against whatever index is current while the reload runs
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            reload_thread = threading.Thread(target=watcher.check)
+            sweeps = []
+            generations = set()
+            reload_thread.start()
+            while reload_thread.is_alive():
+                started = time.perf_counter()
+                blocklist = watcher.current
+                for props in processes:
+                    blocklist.match(props)
+                generations.add(blocklist.generation)
+                sweeps.append(time.perf_counter() - started)
+            reload_thread.join()
+            print(f"background reload of {count} rows: {watcher.last_reload_seconds * 1000:.1f} ms, "
+                  f"{len(sweeps)} sweeps of {process_count} processes ran meanwhile on generations "
+                  f"{sorted(generations)}, slowest sweep {max(sweeps) * 1000:.1f} ms")
+            print(f"now on generation {watcher.current.generation}")
+
+        checks = 10000
+        started = time.perf_counter()
+        for _ in range(checks):
+            watcher.check()
+        print(f"unchanged-file check: {(time.perf_counter() - started) / checks * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--reload" in sys.argv:
+        run_reload_benchmark()
+    else:
+        run_benchmark()
@@ -0,0 +1,266 @@
+"""Block decision and enforcement of the SVS monitor.
+
+DlpController holds the window table, the active policy and the block state,
+and drives enforcement through the providers in dlp_providers, the registry
+reconciler and the optional process-start enforcer. SVS.py wires it to the
+live desktop; dlp_replay.py wires it to simulated providers.
+"""
+import logging
+import time
+
+from dlp_block_state import BlockHysteresis
+from dlp_registry import REG_SZ
+from dlp_window_state import WindowStateTable
+
+logger = logging.getLogger(__name__)
+
+
+class DlpController:
+    """Decide whether sensitive windows are open and enforce the block state.
+
+    clock is the monotonic clock used to schedule the safety sweep, the
+    registry drift check and the stats log; replays pass their simulated clock.
+    Block transitions reconcile the registry immediately; the drift check runs
+    at most every registry_interval seconds however short the poll interval.
+    Blocking starts as soon as a sensitive window is seen and ends only after
+    hold_down seconds without one and min_dwell seconds of blocking.
+    """
+
+    def __init__(self, windows, processes, keyboard, registry_reconciler, policy_source, disallow_run_key_path,
+                 metrics, clock=time.monotonic, safety_sweep_interval=60, stats_interval=3600, registry_interval=5,
+                 hold_down=15.0, min_dwell=30.0):
+        self.windows = windows
+        self.processes = processes
+        self.keyboard = keyboard
+        self.registry_reconciler = registry_reconciler
+        self.policy_source = policy_source
+        self.disallow_run_key_path = disallow_run_key_path
+        self.metrics = metrics
+        self.clock = clock
+        self.safety_sweep_interval = safety_sweep_interval
+        self.stats_interval = stats_interval
+        self.registry_interval = registry_interval
+        self.active_policy = policy_source.current
+        self.block_print_screen = False
+        self.hysteresis = BlockHysteresis(hold_down, min_dwell, clock)
+        self.process_start_enforcer = None
+        self.session_engine = None
+        self.scheduler = None
+        self.sensitive_first_seen = None
+        self.next_safety_sweep = 0
+        self.next_stats_log = 0
+        self.next_registry_check = 0
+        # Window titles run through a keyword matcher, per policy scope
+        self.titles_matched = 0
+        # Resolve and match time of evaluate_window, folded into the metrics by end_metrics_cycle;
+        # evaluations between cycles (window events, session helpers) count towards the next one
+        self.resolve_time = 0.0
+        self.match_time = 0.0
+        # Only windows added or changed since the previous cycle are re-evaluated
+        self.window_table = WindowStateTable(self.evaluate_window)
+
+    def kill_existing_instances(self, process_names, session_ids=None):
+        """Kill running instances of process_names; returns the number killed."""
+        killed = 0
+        for info in self.processes.iter_processes():
+            if info.name in process_names and (session_ids is None or info.session_id in session_ids):
+                try:
+                    self.processes.kill(info)
+                    killed += 1
+                    logger.info(f"Killed {info.name} with PID {info.pid}")
+                except Exception as e:
+                    logger.error(f"Error killing process {info.name}: {e}")
+        return killed
+
+    def safety_sweep_due(self, now):
+        """Sweep every cycle until the start enforcer has proven itself, then every safety_sweep_interval."""
+        enforcer = self.process_start_enforcer
+        return not enforcer or not enforcer.reliable or now >= self.next_safety_sweep
+
+    def record_safety_sweep(self, now, killed):
+        if killed and self.process_start_enforcer:
+            # A blocked tool started while blocking and survived: the start stream missed it
+            self.process_start_enforcer.missed()
+            logger.warning(f"Safety sweep killed {killed} blocked tool(s) the process start enforcer missed")
+        self.next_safety_sweep = now + self.safety_sweep_interval
+
+    def log_periodic_stats(self):
+        now = self.clock()
+        if now >= self.next_stats_log:
+            self.processes.prune()
+            logger.info(f"Process cache stats: {self.processes.stats()}")
+            logger.info(f"Registry reconciler stats: {self.registry_reconciler.stats()}")
+            logger.info(f"Keyboard hook stats: {self.keyboard.stats()}")
+            logger.info(f"Block state stats: {self.hysteresis.stats()}")
+            logger.info(f"Keyword scope {self.active_policy.scope}: {self.titles_matched} titles matched")
+            if self.process_start_enforcer:
+                logger.info(f"Process start enforcer stats: {self.process_start_enforcer.stats()}")
+            if self.session_engine:
+                logger.info(f"Session engine stats: {self.session_engine.stats()}")
+            if self.scheduler:
+                logger.info(f"Poll scheduler stats: {self.scheduler.stats()}")
+            logger.info(f"Loop timings p50/p99 (ms): {self.metrics.summary()}")
+            self.next_stats_log = now + self.stats_interval
+
+    def block_apps(self):
+        if self.process_start_enforcer:
+            self.process_start_enforcer.enabled = True
+        self.check_and_update_registry(True)
+        self.kill_existing_instances(self.active_policy.blocked_tool_names)
+        logger.info("Applications have been blocked and existing instances killed.")
+        # The hook stays installed; only its enable flag changes
+        self.keyboard.enable()
+        self.block_print_screen = True
+        logger.info("Print Screen key has been disabled.")
+
+    def unblock_apps(self):
+        self.check_and_update_registry(False)
+        if self.process_start_enforcer:
+            self.process_start_enforcer.enabled = False
+        logger.info("Applications have been unblocked.")
+        self.block_print_screen = False
+        self.keyboard.disable()
+        logger.info("Print Screen key has been enabled.")
+
+    def reconcile_registry(self):
+        started = time.perf_counter()
+        changed = self.registry_reconciler.reconcile()
+        self.metrics.add("registry", time.perf_counter() - started)
+        return changed
+
+    def check_and_update_registry(self, block_required):
+        for value_name, value_data in self.active_policy.blocked_tools.items():
+            if block_required:
+                self.registry_reconciler.set_value(self.disallow_run_key_path, value_name, value_data, REG_SZ)
+            else:
+                self.registry_reconciler.remove_value(self.disallow_run_key_path, value_name)
+        self.reconcile_registry()
+
+    def evaluate_window(self, hwnd, record):
+        """Return (process_name, pid, keyword) if the window requires blocking, else None."""
+        if not record.visible:
+            # Pruned by the window provider's filter: minimized, or a watched window that cannot be captured
+            return None
+        started = time.perf_counter()
+        info = self.processes.lookup(record.pid)
+        resolved = time.perf_counter()
+        self.resolve_time += resolved - started
+        if info is None:
+            return None
+        process_name, pid = info.name, record.pid
+        matcher = self.active_policy.keyword_matchers.get(process_name, self.active_policy.default_matcher)
+        if matcher is None:
+            return None
+        self.titles_matched += 1
+        keywords = matcher.find_all(record.title)
+        self.match_time += time.perf_counter() - resolved
+        for keyword in keywords:
+            if record.minimized:
+                logger.info(f"Process {process_name} (PID: {pid}) with keyword {keyword} is minimized, skipping")
+                continue
+            if not self.windows.capturable(hwnd):
+                logger.info(f"Process {process_name} (PID: {pid}) with keyword {keyword} cannot be captured "
+                            f"(cloaked, off-screen or covered), skipping")
+                # The provider now watches its placement and reports it visible again when it comes into view
+                record.visible = False
+                return None
+            logger.info(f"Blocking required by process {process_name} (PID: {pid}) with keyword: {keyword}")
+            if self.sensitive_first_seen is None and not self.block_print_screen:
+                self.sensitive_first_seen = resolved
+            return (process_name, pid, keyword)
+        return None
+
+    def refresh_policy(self):
+        """Switch to a newly loaded policy; returns True if windows must be re-evaluated."""
+        policy = self.policy_source.current
+        if policy is self.active_policy:
+            return False
+        previous = self.active_policy
+        self.active_policy = policy
+        # Tools dropped from the policy must not stay in DisallowRun
+        for value_name in previous.blocked_tools.keys() - policy.blocked_tools.keys():
+            self.registry_reconciler.remove_value(self.disallow_run_key_path, value_name)
+        self.check_and_update_registry(self.block_print_screen)
+        if self.process_start_enforcer:
+            self.process_start_enforcer.blocked_names = policy.blocked_tool_names
+        logger.info(f"Applied policy generation {policy.generation} from {policy.source}")
+        return True
+
+    def apply_block_state(self, block_required, detected_by):
+        """Feed the raw decision through the hysteresis and enforce the result."""
+        if self.hysteresis.update(block_required):
+            if not self.block_print_screen:
+                self.block_apps()
+                logger.info(f"Blocking triggered by process {detected_by[0]} (PID: {detected_by[1]}) "
+                            f"with keyword: {detected_by[2]}")
+                if self.sensitive_first_seen is not None:
+                    self.metrics.observe("detection_to_block", time.perf_counter() - self.sensitive_first_seen)
+        else:
+            if self.block_print_screen:
+                self.unblock_apps()
+        self.sensitive_first_seen = None
+
+    def timing_mark(self):
+        """Clock and the resolve, match and registry time recorded so far, for add_phase."""
+        return time.perf_counter(), self.resolve_time + self.match_time + self.metrics.pending["registry"]
+
+    def add_phase(self, phase, mark):
+        """Add the time since mark to phase, minus the resolve, match and registry time nested in it.
+
+        Returns a new mark, so consecutive phases share one clock read.
+        """
+        now = self.timing_mark()
+        self.metrics.add(phase, max(now[0] - mark[0] - (now[1] - mark[1]), 0.0))
+        return now
+
+    def end_metrics_cycle(self):
+        metrics = self.metrics
+        metrics.add("resolve", self.resolve_time)
+        metrics.add("match", self.match_time)
+        self.resolve_time = self.match_time = 0.0
+        metrics.end_cycle()
+        try:
+            self.metrics.export_if_due()
+        except OSError as e:
+            logger.error(f"Error writing metrics file {self.metrics.path}: {e}")
+
+    def enforce_block_state(self):
+        if self.block_print_screen:
+            # New instances are killed on start by the process start enforcer; the
+            # full sweep runs every cycle until that stream has killed a real start,
+            # and again whenever it is down or has missed one
+            now = self.clock()
+            if self.safety_sweep_due(now):
+                self.record_safety_sweep(now, self.kill_existing_instances(self.active_policy.blocked_tool_names))
+
+        # Rewrite registry policy values only where a hive has drifted from the desired state
+        now = self.clock()
+        if now >= self.next_registry_check:
+            self.reconcile_registry()
+            self.next_registry_check = now + self.registry_interval
+        self.log_periodic_stats()
+
+    def run_cycle(self):
+        """One polling cycle: enumerate, decide and enforce."""
+        if self.refresh_policy():
+            self.window_table.clear()
+        mark = self.timing_mark()
+        self.windows.scan(self.window_table)
+        mark = self.add_phase("enumerate", mark)
+        self.apply_block_state(self.window_table.block_required, self.window_table.detected_by())
+        self.enforce_block_state()
+        self.add_phase("enforce", mark)
+        self.end_metrics_cycle()
+
+    def run_resync_cycle(self, monitor):
+        """Periodic cycle of the event-driven mode: resync the monitor's table and enforce."""
+        if self.refresh_policy():
+            monitor.table.clear()
+        mark = self.timing_mark()
+        monitor.rescan(self.windows.scan)
+        mark = self.add_phase("enumerate", mark)
+        # Events only report flips of the raw decision; a pending release is due here
+        self.apply_block_state(monitor.block_required, monitor.table.detected_by())
+        self.enforce_block_state()
+        self.add_phase("enforce", mark)
+        self.end_metrics_cycle()
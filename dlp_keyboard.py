@@ -0,0 +1,287 @@
+"""Always-installed low-level keyboard hook that suppresses screen-capture keys.
+
+LowLevelKeyboardHook installs WH_KEYBOARD_LL once, on a dedicated thread with
+its own message loop, and keeps it for the life of the process. Blocking is
+switched by the enabled attribute: a single attribute store, atomic under the
+GIL, so the monitor flips it in O(1) without touching the hook itself and
+without removing hooks other code installed.
+
+Windows silently unhooks a low-level hook whose callback exceeds
+LowLevelHooksTimeout, so the callback does no I/O or logging; it records its
+own duration and the blocked-key count, which the monitor logs with its stats.
+
+CaptureKeyFilter holds the key decision (PrtSc with any modifiers, including
+Alt+PrtSc, and Win+Shift+S) and runs without Windows for the benchmark. A
+modifier key-up can be lost (Win+L, a UAC prompt or Ctrl+Alt+Del switch to
+another desktop), so on S the hook re-reads Shift and Win with
+GetAsyncKeyState instead of trusting the tracked bits.
+"""
+import ctypes
+import threading
+import time
+from collections import deque
+
+# Virtual-key codes and hook constants (winuser.h)
+VK_SNAPSHOT = 0x2C
+VK_S = 0x53
+VK_LWIN = 0x5B
+VK_RWIN = 0x5C
+VK_LSHIFT = 0xA0
+VK_RSHIFT = 0xA1
+VK_SHIFT = 0x10
+WH_KEYBOARD_LL = 13
+HC_ACTION = 0
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_QUIT = 0x0012
+
+key_down_messages = (WM_KEYDOWN, WM_SYSKEYDOWN)
+
+shift_bits = {VK_LSHIFT: 1, VK_RSHIFT: 2, VK_SHIFT: 1}
+win_bits = {VK_LWIN: 4, VK_RWIN: 8}
+modifier_bits = {**shift_bits, **win_bits}
+# Keys queried to rebuild the modifier bits; VK_SHIFT covers either Shift key
+key_state_bits = ((VK_SHIFT, 1), (VK_LWIN, 4), (VK_RWIN, 8))
+
+
+class CaptureKeyFilter:
+    """Decide per key event whether it belongs to a screen-capture shortcut.
+
+    Modifier state is tracked from the events themselves, so the decision is
+    correct when blocking is enabled halfway through a key chord. key_state(vk),
+    when set, returns True if the key is physically down; it replaces the
+    tracked bits when S goes down so a lost key-up cannot leave a modifier stuck.
+    """
+
+    def __init__(self, key_state=None):
+        self.key_state = key_state
+        self.modifiers = 0
+        self.suppressing_s = False
+        self.resyncs = 0
+
+    def handle(self, vk, down):
+        """Return True if the key event must be suppressed while blocking."""
+        bit = modifier_bits.get(vk)
+        if bit:
+            if down:
+                self.modifiers |= bit
+            else:
+                self.modifiers &= ~bit
+            return False
+        if vk == VK_SNAPSHOT:
+            return True
+        if vk == VK_S:
+            if down:
+                if self.key_state:
+                    modifiers = 0
+                    for key, key_bit in key_state_bits:
+                        if self.key_state(key):
+                            modifiers |= key_bit
+                    # Compare as Shift and Win pressed or not; left/right detail is not queried
+                    if bool(modifiers & 3) != bool(self.modifiers & 3) or \
+                            bool(modifiers & 12) != bool(self.modifiers & 12):
+                        self.resyncs += 1
+                    self.modifiers = modifiers
+                self.suppressing_s = bool(self.modifiers & 3) and bool(self.modifiers & 12)
+                return self.suppressing_s
+            # Swallow the release of a swallowed press, whatever the modifiers are now
+            suppressed, self.suppressing_s = self.suppressing_s, False
+            return suppressed
+        return False
+
+
+class LowLevelKeyboardHook:
+    """Persistent WH_KEYBOARD_LL hook gated by the enabled flag.
+
+    Callback durations above latency_budget seconds are counted separately;
+    any of them risk the hook being removed by Windows.
+    """
+
+    def __init__(self, latency_budget=0.001, latency_samples=10000):
+        self.enabled = False
+        self.latency_budget = latency_budget
+        self.filter = CaptureKeyFilter()
+        self.callbacks = 0
+        self.blocked = 0
+        self.over_budget = 0
+        self.max_latency = 0.0
+        self.max_delivery_lag_ms = 0
+        self.latencies = deque(maxlen=latency_samples)
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._error = None
+        self._callback = None
+
+    # Provider interface used by DlpController
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def start(self, timeout=5):
+        self._thread = threading.Thread(target=self._run, name="KeyboardHook", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        if self._thread_id:
+            ctypes.WinDLL('user32').PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'enabled': self.enabled,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'callbacks': self.callbacks,
+            'blocked': self.blocked,
+            'modifier_resyncs': self.filter.resyncs,
+            'over_budget': self.over_budget,
+            'latency_p50_us': latencies[count // 2] * 1e6 if count else None,
+            'latency_p99_us': latencies[min(int(count * 0.99), count - 1)] * 1e6 if count else None,
+            'latency_max_us': self.max_latency * 1e6,
+            'delivery_lag_max_ms': self.max_delivery_lag_ms,
+        }
+
+    def _record(self, started):
+        elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        if elapsed > self.max_latency:
+            self.max_latency = elapsed
+        if elapsed > self.latency_budget:
+            self.over_budget += 1
+
+    def _run(self):
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+
+        class KBDLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [('vkCode', wintypes.DWORD), ('scanCode', wintypes.DWORD), ('flags', wintypes.DWORD),
+                        ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        LRESULT = ctypes.c_ssize_t
+        HOOKPROC = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+        user32.SetWindowsHookExW.restype = wintypes.HHOOK
+        user32.SetWindowsHookExW.argtypes = [ctypes.c_int, HOOKPROC, wintypes.HINSTANCE, wintypes.DWORD]
+        user32.CallNextHookEx.restype = LRESULT
+        user32.CallNextHookEx.argtypes = [wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM]
+        user32.UnhookWindowsHookEx.argtypes = [wintypes.HHOOK]
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+        kernel32.GetModuleHandleW.argtypes = [wintypes.LPCWSTR]
+        get_tick_count = kernel32.GetTickCount
+        get_tick_count.restype = wintypes.DWORD
+        get_async_key_state = user32.GetAsyncKeyState
+        get_async_key_state.restype = ctypes.c_short
+        get_async_key_state.argtypes = [ctypes.c_int]
+        self.filter.key_state = lambda vk: get_async_key_state(vk) < 0
+        call_next = user32.CallNextHookEx
+        key_info_pointer = ctypes.POINTER(KBDLLHOOKSTRUCT)
+        perf_counter = time.perf_counter
+
+        def callback(n_code, w_param, l_param):
+            started = perf_counter()
+            self.callbacks += 1
+            if n_code == HC_ACTION:
+                info = ctypes.cast(l_param, key_info_pointer).contents
+                # Injected events (e.g. on-screen keyboards, automation) are judged the same way
+                suppress = self.filter.handle(info.vkCode, w_param in key_down_messages)
+                lag = (get_tick_count() - info.time) & 0xFFFFFFFF
+                if lag > self.max_delivery_lag_ms and lag < 0x80000000:
+                    self.max_delivery_lag_ms = lag
+                if suppress and self.enabled:
+                    if w_param in key_down_messages:
+                        self.blocked += 1
+                    self._record(started)
+                    return 1
+            self._record(started)
+            return call_next(None, n_code, w_param, l_param)
+
+        self._callback = HOOKPROC(callback)
+        hook = user32.SetWindowsHookExW(WH_KEYBOARD_LL, self._callback, kernel32.GetModuleHandleW(None), 0)
+        if not hook:
+            self._error = ctypes.WinError(ctypes.get_last_error())
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        if not hook:
+            return
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWindowsHookEx(hook)
+
+
+def run_benchmark(events=200000, live_seconds=0):
+    """Time the per-key decision on a typing stream with capture shortcuts mixed in.
+
+    With live_seconds (Windows only) the real hook is installed and enabled
+    for that long, and its measured callback latencies are printed.
+    """
+    import random
+
+    rng = random.Random(5)
+    stream = []
+    while len(stream) < events:
+        roll = rng.random()
+        if roll < 0.01:
+            stream += [(VK_SNAPSHOT, True), (VK_SNAPSHOT, False)]
+        elif roll < 0.02:
+            stream += [(VK_LWIN, True), (VK_LSHIFT, True), (VK_S, True), (VK_S, False),
+                       (VK_LSHIFT, False), (VK_LWIN, False)]
+        elif roll < 0.05:
+            stream += [(VK_LSHIFT, True), (VK_S, True), (VK_S, False), (VK_LSHIFT, False)]
+        else:
+            vk = rng.randrange(0x41, 0x5B)
+            stream += [(vk, True), (vk, False)]
+
+    perf_counter = time.perf_counter
+    for name in ("tracked", "key state"):
+        # The key state is the simulated keyboard: every key down now
+        pressed = set()
+        key_filter = CaptureKeyFilter((lambda vk: vk in pressed or (vk == VK_SHIFT and bool(
+            pressed & {VK_LSHIFT, VK_RSHIFT}))) if name == "key state" else None)
+        suppressed = 0
+        started = perf_counter()
+        for vk, down in stream:
+            if down:
+                pressed.add(vk)
+            else:
+                pressed.discard(vk)
+            if key_filter.handle(vk, down):
+                suppressed += 1
+        elapsed = perf_counter() - started
+        print(f"{name:9}: key events: {len(stream)}, suppressed: {suppressed}, "
+              f"decision cost: {elapsed / len(stream) * 1e9:.0f} ns per event")
+
+        # Win+L: the Win key-up goes to the secure desktop and never reaches the hook
+        for vk, down in ((VK_LWIN, True), (0x4C, True), (0x4C, False)):
+            key_filter.handle(vk, down)
+        pressed.clear()
+        stuck = key_filter.handle(VK_LSHIFT, True) or key_filter.handle(VK_S, True)
+        key_filter.handle(VK_S, False)
+        key_filter.handle(VK_LSHIFT, False)
+        print(f"{name:9}: Shift+S after a lost Win key-up suppressed: {stuck}")
+
+    if live_seconds:
+        hook = LowLevelKeyboardHook()
+        hook.start()
+        hook.enable()
+        print(f"hook installed and enabled for {live_seconds} s, type and press PrtSc / Win+Shift+S")
+        time.sleep(live_seconds)
+        hook.stop()
+        print(f"live hook: {hook.stats()}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    run_benchmark(live_seconds=30 if "--live" in sys.argv else 0)
@@ -0,0 +1,159 @@
+"""Compiled multi-keyword matching for DLP window titles.
+
+Each keyword list is compiled once into an Aho-Corasick automaton over the
+case-folded keywords, so a title is scanned in a single pass no matter how
+many keywords the policy contains. Short lists also get a regular-expression
+prefilter: the re engine rejects a title that contains none of the keywords
+in C, several times faster than walking the automaton in Python, which then
+only runs for titles that match. Past prefilter_limit keywords the
+alternation becomes slower than the automaton and is not built.
+"""
+import random
+import re
+import time
+
+prefilter_limit = 32
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton returning every keyword contained in a title."""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._goto = [{}]
+        self._outputs = [()]
+        fail = [0]
+
+        for index, keyword in enumerate(self.keywords):
+            folded = keyword.casefold()
+            if not folded:
+                continue
+            state = 0
+            for char in folded:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._outputs.append(())
+                    fail.append(0)
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._outputs[state] += (index,)
+
+        # Breadth-first pass to compute failure links and merge their outputs
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] += self._outputs[fail[next_state]]
+        self._fail = fail
+
+        folded_keywords = [keyword.casefold() for keyword in self.keywords if keyword.casefold()]
+        self._prefilter = None
+        if len(folded_keywords) <= prefilter_limit:
+            # An empty alternation would match every title; an empty list matches none
+            self._prefilter = re.compile("|".join(map(re.escape, folded_keywords)) or r"(?!)").search
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find_all(self, title):
+        """Return the matched keywords in policy order, each at most once."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        folded = title.casefold()
+        if self._prefilter is not None and self._prefilter(folded) is None:
+            return []
+        found = set()
+        state = 0
+        for char in folded:
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if outputs[state]:
+                found.update(outputs[state])
+        if not found:
+            return []
+        return [self.keywords[index] for index in sorted(found)]
+
+    def search(self, title):
+        """Return the first matched keyword in policy order, or None."""
+        matches = self.find_all(title)
+        return matches[0] if matches else None
+
+
+def compile_process_keywords(process_keywords, programs=(), program_keywords=(), compiled=None):
+    """Compile {process_name: keywords} plus programs sharing program_keywords.
+
+    Identical keyword lists share a single automaton; pass the same compiled
+    dict ({keyword tuple: KeywordMatcher}) to share them with other callers.
+    """
+    compiled = {} if compiled is None else compiled
+    matchers = {}
+    for process_name, keywords in process_keywords.items():
+        key = tuple(keywords)
+        if key not in compiled:
+            compiled[key] = KeywordMatcher(keywords)
+        matchers[process_name.lower()] = compiled[key]
+    if programs:
+        key = tuple(program_keywords)
+        if key not in compiled:
+            compiled[key] = KeywordMatcher(program_keywords)
+        for process_name in programs:
+            matchers.setdefault(process_name.lower(), compiled[key])
+    return matchers
+
+
+def run_benchmark(title_count=10000, keyword_count=1000, seed=1):
+    """Compare the compiled matcher with the nested lower() loops on 10k titles x 1k keywords."""
+    rng = random.Random(seed)
+    words = ["ocbc", "signplus", "account", "edit", "new", "retrieval", "cheque", "board",
+             "resolution", "search", "rules", "report", "inbox", "outlook", "teams", "excel",
+             "malaysia", "bank", "signatory", "approval", "draft", "portal", "summary"]
+    keywords = list(dict.fromkeys(
+        " ".join(rng.choice(words) for _ in range(rng.randint(2, 4))) + f" {i}"
+        for i in range(keyword_count)))
+    keywords[:3] = ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po"]
+    titles = [
+        " ".join(rng.choice(words).capitalize() for _ in range(rng.randint(3, 9))) + " - Microsoft Edge"
+        for _ in range(title_count)
+    ]
+    for i in range(0, title_count, 50):
+        titles[i] = f"{rng.choice(keywords)} - Microsoft Edge"
+
+    started = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    compile_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled_hits = sum(1 for title in titles if matcher.find_all(title))
+    compiled_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive_hits = 0
+    for title in titles:
+        for keyword in keywords:
+            if keyword.lower() in title.lower():
+                naive_hits += 1
+                break
+    naive_time = time.perf_counter() - started
+
+    print(f"titles: {title_count}, keywords: {keyword_count}, automaton states: {len(matcher._goto)}")
+    print(f"compile: {compile_time * 1000:.1f} ms")
+    print(f"compiled matcher: {compiled_time * 1000:.1f} ms ({compiled_hits} titles matched)")
+    print(f"nested lower() loops: {naive_time * 1000:.1f} ms ({naive_hits} titles matched)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,234 @@
+"""Asynchronous JSON-lines logging shared by the DLP agents.
+
+The agent threads only put records on a bounded queue. A background writer
+drains the queue in batches, formats each record as one JSON object per line,
+collapses identical messages repeated within an interval into a single count
+line, and rotates the log file into gzip-compressed segments.
+"""
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class AgentQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records without formatting them and never block the caller."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting (timestamps, JSON, tracebacks) is left to the writer thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CompressedRotatingFile:
+    """Append-only log file rotated into name.1.gz ... name.N.gz segments."""
+
+    def __init__(self, path, max_bytes, backup_count):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotation_failures = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.stream = open(path, 'a', encoding='utf-8')
+
+    def write_lines(self, lines):
+        data = "".join(lines)
+        if self.max_bytes and self.stream.tell() + len(data) > self.max_bytes and self.stream.tell():
+            try:
+                self.rotate()
+            except OSError:
+                # Keep appending past max_bytes until a rotation succeeds
+                self.rotation_failures += 1
+        self.stream.write(data)
+        self.stream.flush()
+
+    def rotate(self):
+        self.stream.close()
+        rotated = False
+        try:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}.gz"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}.gz")
+            if self.backup_count:
+                with open(self.path, 'rb') as source, gzip.open(f"{self.path}.1.gz", 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            rotated = True
+        finally:
+            # Always reopen; after a failed rotation keep appending to the current file
+            self.stream = open(self.path, 'w' if rotated else 'a', encoding='utf-8')
+
+    def close(self):
+        self.stream.close()
+
+
+def format_json_line(record, repeated=0):
+    entry = {
+        'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+        'level': record.levelname,
+        'logger': record.name,
+        'message': record.getMessage(),
+    }
+    if record.exc_info:
+        entry['exception'] = logging.Formatter().formatException(record.exc_info)
+    if repeated:
+        entry['repeated'] = repeated
+    return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+class BatchingLogWriter:
+    """Drain the log queue in batches on a background thread."""
+
+    def __init__(self, log_queue, log_file, collapse_interval=60, batch_size=256, flush_interval=0.5):
+        self.queue = log_queue
+        self.log_file = log_file
+        self.collapse_interval = collapse_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.collapsed = 0
+        self.errors = 0
+        self._seen = {}
+        self._interval_end = time.monotonic() + collapse_interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._write_batch(timeout=self.flush_interval)
+            except Exception:
+                # A bad record or batch must not end logging for the life of the agent
+                self.errors += 1
+        self._write_batch(timeout=0)
+        self._flush_repeats()
+        self.log_file.close()
+
+    def _write_batch(self, timeout):
+        lines = []
+        try:
+            record = self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+            while True:
+                line = self._format(record)
+                if line:
+                    lines.append(line)
+                if len(lines) >= self.batch_size:
+                    break
+                record = self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        if time.monotonic() >= self._interval_end:
+            lines.extend(self._repeat_lines())
+        if lines:
+            try:
+                self.log_file.write_lines(lines)
+                self.written += len(lines)
+            except Exception:
+                self.errors += 1  # Disk full or file locked; keep the agent running
+
+    def _format(self, record):
+        # Identical messages within the interval are written once and counted
+        key = (record.levelno, record.name, record.getMessage())
+        entry = self._seen.get(key)
+        if entry is not None:
+            entry[1] += 1
+            self.collapsed += 1
+            return None
+        self._seen[key] = [record, 0]
+        return format_json_line(record)
+
+    def _repeat_lines(self):
+        lines = [format_json_line(record, repeated) for record, repeated in self._seen.values() if repeated]
+        self._seen = {}
+        self._interval_end = time.monotonic() + self.collapse_interval
+        return lines
+
+    def _flush_repeats(self):
+        lines = self._repeat_lines()
+        if lines:
+            self.log_file.write_lines(lines)
+
+
+def setup_logging(log_file_path, level=logging.INFO, max_bytes=5 * 1024 * 1024, backup_count=5,
+                  collapse_interval=60, max_queue=10000):
+    """Route the root logger through the queue and start the background writer."""
+    log_queue = queue.Queue(maxsize=max_queue)
+    handler = AgentQueueHandler(log_queue)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    writer = BatchingLogWriter(log_queue, CompressedRotatingFile(log_file_path, max_bytes, backup_count),
+                               collapse_interval=collapse_interval)
+    writer.start()
+    atexit.register(writer.stop)
+    return writer
+
+
+def run_benchmark(messages=20000):
+    """Compare per-call cost of logging.info on the agent thread: synchronous rotating file vs queue."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        logger = logging.getLogger("benchmark")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        handler = logging.handlers.RotatingFileHandler(
+            os.path.join(directory, "sync.log"), maxBytes=5 * 1024 * 1024, backupCount=1)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+        started = time.perf_counter()
+        for i in range(messages):
+            logger.info(f"Process msedge.exe (PID: {1000 + i % 4}) with keyword ocbc po is minimized, skipping")
+        sync_time = time.perf_counter() - started
+        logger.removeHandler(handler)
+        handler.close()
+
+        log_queue = queue.Queue(maxsize=messages)
+        queue_handler = AgentQueueHandler(log_queue)
+        writer = BatchingLogWriter(log_queue, CompressedRotatingFile(
+            os.path.join(directory, "async.log"), 5 * 1024 * 1024, 5))
+        logger.addHandler(queue_handler)
+        writer.start()
+        started = time.perf_counter()
+        for i in range(messages):
+            logger.info(f"Process msedge.exe (PID: {1000 + i % 4}) with keyword ocbc po is minimized, skipping")
+        async_time = time.perf_counter() - started
+        writer.stop()
+        logger.removeHandler(queue_handler)
+
+        print(f"messages: {messages}")
+        print(f"synchronous RotatingFileHandler: {sync_time / messages * 1e6:.2f} us per call")
+        print(f"queued pipeline: {async_time / messages * 1e6:.2f} us per call "
+              f"({writer.written} lines written, {writer.collapsed} collapsed, "
+              f"{queue_handler.dropped} dropped)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,230 @@
+"""External, hot-reloadable DLP trigger policy.
+
+The policy file is JSON with the same structure as the built-in defaults:
+
+    {
+        "browser_keywords": {"msedge.exe": ["SignPlus for OCBC Bank", ...], ...},
+        "specific_programs": ["javaw.exe", ...],
+        "other_keywords": ["edit account", ...],
+        "blocked_tools": {"SnippingTool": "SnippingTool.exe", ...},
+        "scope": "targeted",
+        "ignored_programs": ["searchhost.exe", ...]
+    }
+
+Keys left out of the file keep their built-in value. blocked_tools maps each
+DisallowRun value name to the executable it blocks. scope is "targeted"
+(browser keywords plus other_keywords for specific_programs) or
+"all_programs" (other_keywords for every other process too, except
+ignored_programs, shell hosts whose windows never show sensitive data).
+Both scopes share one other_keywords automaton.
+
+ignored_programs changes behaviour from the old SVSDLPControl_AllPrograms.py
+fork, which checked every process: shell-host windows such as SearchHost's
+"Search" matched the "search" keyword and triggered a block, and no longer do.
+Set "ignored_programs": [] to restore the old behaviour.
+
+The file is validated and compiled into keyword automata and name sets on a
+background thread, and the compiled policy is swapped in with a single
+reference assignment so the monitor loop never waits for a reload.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from dlp_keywords import KeywordMatcher, compile_process_keywords
+
+logger = logging.getLogger(__name__)
+
+policy_keys = ("browser_keywords", "specific_programs", "other_keywords", "blocked_tools")
+optional_policy_keys = ("scope", "ignored_programs")
+scopes = ("targeted", "all_programs")
+
+# keyword_matchers.get(process_name, default_matcher) is the matcher for a
+# process; None means its windows are not checked
+CompiledPolicy = namedtuple('CompiledPolicy', [
+    'generation', 'source', 'keyword_matchers', 'other_keywords_matcher', 'default_matcher', 'scope',
+    'specific_programs', 'blocked_tools', 'blocked_tool_names', 'compile_seconds',
+])
+
+
+class PolicyError(ValueError):
+    """Raised when a policy file is malformed; the previous policy stays active."""
+
+
+def _string_list(data, key):
+    value = data[key]
+    if not isinstance(value, list) or not all(isinstance(item, str) and item.strip() for item in value):
+        raise PolicyError(f"{key} must be a list of non-empty strings")
+    return value
+
+
+def _string_map(data, key):
+    value = data[key]
+    if not isinstance(value, dict) or not all(isinstance(name, str) and name.strip() for name in value):
+        raise PolicyError(f"{key} must be an object with non-empty string keys")
+    return value
+
+
+def validate_policy(data, defaults):
+    """Merge data over defaults and check every field; returns the merged dict."""
+    if not isinstance(data, dict):
+        raise PolicyError("policy must be a JSON object")
+    unknown = set(data) - set(policy_keys) - set(optional_policy_keys)
+    if unknown:
+        raise PolicyError(f"unknown policy keys: {', '.join(sorted(unknown))}")
+    merged = dict(defaults)
+    merged.update(data)
+
+    browser_keywords = _string_map(merged, "browser_keywords")
+    for process_name in browser_keywords:
+        _string_list(browser_keywords, process_name)
+    _string_list(merged, "specific_programs")
+    _string_list(merged, "other_keywords")
+    blocked_tools = _string_map(merged, "blocked_tools")
+    for value_name, exe in blocked_tools.items():
+        if not isinstance(exe, str) or not exe.strip():
+            raise PolicyError(f"blocked_tools[{value_name}] must be an executable name")
+    if merged.get("scope", "targeted") not in scopes:
+        raise PolicyError(f"scope must be one of {', '.join(scopes)}")
+    if "ignored_programs" in merged:
+        _string_list(merged, "ignored_programs")
+    return merged
+
+
+def compile_policy(data, generation=0, source="built-in"):
+    """Compile a validated policy dict into the runtime matching structures."""
+    started = time.perf_counter()
+    compiled = {}
+    keyword_matchers = compile_process_keywords(
+        data["browser_keywords"], data["specific_programs"], data["other_keywords"], compiled)
+    other_keywords = tuple(data["other_keywords"])
+    other_keywords_matcher = compiled.get(other_keywords) or KeywordMatcher(other_keywords)
+    scope = data.get("scope", "targeted")
+    default_matcher = None
+    if scope == "all_programs":
+        default_matcher = other_keywords_matcher
+        for process_name in data.get("ignored_programs", ()):
+            keyword_matchers.setdefault(process_name.lower(), None)
+    blocked_tools = dict(data["blocked_tools"])
+    return CompiledPolicy(
+        generation=generation,
+        source=source,
+        keyword_matchers=keyword_matchers,
+        other_keywords_matcher=other_keywords_matcher,
+        default_matcher=default_matcher,
+        scope=scope,
+        specific_programs=frozenset(name.lower() for name in data["specific_programs"]),
+        blocked_tools=blocked_tools,
+        blocked_tool_names=frozenset(exe.lower() for exe in blocked_tools.values()),
+        compile_seconds=time.perf_counter() - started,
+    )
+
+
+def load_policy(path, defaults, generation):
+    with open(path, encoding='utf-8') as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError as e:
+            raise PolicyError(f"invalid JSON: {e}") from e
+    return compile_policy(validate_policy(data, defaults), generation, path)
+
+
+class PolicyWatcher:
+    """Reload the policy file when its mtime or size changes.
+
+    current always holds a complete CompiledPolicy; readers take the reference
+    once per cycle and never see a partially built policy.
+    """
+
+    def __init__(self, path, defaults, interval=2.0):
+        self.path = path
+        self.defaults = validate_policy({}, defaults)
+        self.interval = interval
+        self.current = compile_policy(self.defaults)
+        self.reloads = 0
+        self.failures = 0
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reload if the file changed since the last check; returns True on a swap."""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is None:
+            logger.warning(f"Policy file {self.path} not found, keeping policy from {self.current.source}")
+            return False
+        return self.reload()
+
+    def reload(self):
+        try:
+            policy = load_policy(self.path, self.defaults, self.current.generation + 1)
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            logger.error(f"Error loading policy file {self.path}, keeping generation "
+                         f"{self.current.generation}: {e}")
+            return False
+        self.current = policy
+        self.reloads += 1
+        logger.info(f"Loaded policy generation {policy.generation} from {policy.source} "
+                    f"in {policy.compile_seconds * 1000:.1f} ms")
+        return True
+
+    def start(self):
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="PolicyWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking policy file {self.path}: {e}")
+
+
+def run_benchmark(keyword_counts=(10, 1000, 10000), process_count=5):
+    """Measure load + compile time of policies of growing size and the cost of a change check."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "policy.json")
+        defaults = {key: {} if key in ("browser_keywords", "blocked_tools") else [] for key in policy_keys}
+        for count in keyword_counts:
+            keywords = [f"sensitive window title {i}" for i in range(count)]
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({
+                    "browser_keywords": {f"browser{i}.exe": keywords for i in range(process_count)},
+                    "specific_programs": ["javaw.exe", "java.exe"],
+                    "other_keywords": keywords,
+                    "blocked_tools": {"SnippingTool": "SnippingTool.exe"},
+                }, file)
+            started = time.perf_counter()
+            policy = load_policy(path, defaults, 1)
+            total = time.perf_counter() - started
+            print(f"keywords per list: {count:>6}, load + compile: {total * 1000:8.1f} ms "
+                  f"(compile {policy.compile_seconds * 1000:.1f} ms)")
+
+        watcher = PolicyWatcher(path, defaults)
+        watcher.check()
+        checks = 10000
+        started = time.perf_counter()
+        for _ in range(checks):
+            watcher.check()
+        print(f"unchanged-file check: {(time.perf_counter() - started) / checks * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,109 @@
+"""Process metadata cache shared by the SVS window loop and process sweeps.
+
+Entries are keyed by (pid, create_time) so a reused PID is detected and
+re-resolved instead of returning the previous process's name. Entries for
+processes that have exited are evicted on lookup failure and on every full
+sweep.
+"""
+import ctypes
+import sys
+from collections import namedtuple
+
+import psutil
+
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'create_time', 'name', 'exe', 'session_id'])
+
+
+def get_session_id(pid):
+    """Return the Terminal Services session id of a process, or None."""
+    if sys.platform != 'win32':
+        return None
+    session_id = ctypes.c_ulong()
+    if not ctypes.windll.kernel32.ProcessIdToSessionId(pid, ctypes.byref(session_id)):
+        return None
+    return session_id.value
+
+
+class ProcessInfoCache:
+    """Cache of lowercase name, exe path and session id per (pid, create_time)."""
+
+    def __init__(self, process_class=psutil.Process, process_iter=psutil.process_iter):
+        self.process_class = process_class
+        self.process_iter = process_iter
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def lookup(self, pid):
+        """Return the ProcessInfo for a live pid, or None if it has exited."""
+        try:
+            process = self.process_class(pid)
+            return self._resolve(process)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            if self.entries.pop(pid, None) is not None:
+                self.evictions += 1
+            return None
+
+    def iter_processes(self):
+        """Yield (process, info) for every running process, evicting exited ones."""
+        seen = set()
+        for process in self.process_iter():
+            try:
+                info = self._resolve(process)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            seen.add(process.pid)
+            yield process, info
+
+        for pid in [pid for pid in self.entries if pid not in seen]:
+            del self.entries[pid]
+            self.evictions += 1
+
+    def prune(self):
+        """Evict entries whose pid no longer exists."""
+        live_pids = set(psutil.pids())
+        for pid in [pid for pid in self.entries if pid not in live_pids]:
+            del self.entries[pid]
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'reused_pids': self.reused,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def _resolve(self, process):
+        pid = process.pid
+        try:
+            create_time = process.create_time()
+        except psutil.AccessDenied:
+            create_time = None
+
+        info = self.entries.get(pid)
+        if info is not None:
+            if info.create_time == create_time:
+                self.hits += 1
+                return info
+            # Same pid, different start time: the PID has been reused
+            self.reused += 1
+
+        self.misses += 1
+        with process.oneshot():
+            try:
+                name = process.name().lower()
+            except psutil.AccessDenied:
+                name = ''
+            try:
+                exe = process.exe()
+            except psutil.AccessDenied:
+                exe = None
+        info = ProcessInfo(pid, create_time, name, exe, get_session_id(pid))
+        self.entries[pid] = info
+        return info
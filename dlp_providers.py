@@ -0,0 +1,183 @@
+"""Platform providers used by the SVS decision code.
+
+The controller only talks to these narrow interfaces:
+
+    windows    scan(table) -> changes, snapshot(hwnd) -> WindowRecord or None,
+               capturable(hwnd) -> bool (asked only for windows whose title matched)
+    processes  lookup(pid) -> ProcessInfo or None, iter_processes() -> ProcessInfo...,
+               kill(info), prune(), stats()
+    keyboard   enable(), disable(), stats()
+
+The Win32 providers wrap win32gui/psutil on a live desktop; SVS enumerates
+windows with dlp_window_snapshot.NativeWindowProvider and blocks keys with
+dlp_keyboard.LowLevelKeyboardHook. The
+simulated providers are driven by the replay harness (dlp_replay.py) so the
+same decision code runs on any platform.
+"""
+import psutil
+
+from dlp_process_cache import ProcessInfo, ProcessInfoCache
+from dlp_window_state import WindowRecord
+
+
+class Win32WindowProvider:
+    """Top-level visible, enabled, titled windows of the current desktop, through pywin32."""
+
+    def __init__(self, win32gui=None, win32process=None):
+        if win32gui is None:
+            import win32gui
+        if win32process is None:
+            import win32process
+
+        self.win32gui = win32gui
+        self.win32process = win32process
+
+    def scan(self, table):
+        # Unchanged windows are matched in place, so a steady desktop allocates no records
+        table.begin_snapshot()
+        self.win32gui.EnumWindows(self._observe_window, table)
+        return table.end_snapshot()
+
+    def snapshot(self, hwnd):
+        win32gui = self.win32gui
+        if not (win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd)):
+            return None
+        title = win32gui.GetWindowText(hwnd).strip()
+        if not title:
+            return None
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return WindowRecord(title, pid, bool(win32gui.IsIconic(hwnd)), True)
+
+    def capturable(self, hwnd):
+        return True
+
+    def _observe_window(self, hwnd, table):
+        win32gui = self.win32gui
+        if win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd):
+            title = win32gui.GetWindowText(hwnd).strip()
+            if title:
+                _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+                table.observe(hwnd, title, pid, bool(win32gui.IsIconic(hwnd)), True)
+
+
+class PsutilProcessProvider:
+    """Live processes through the shared ProcessInfoCache."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or ProcessInfoCache()
+
+    def lookup(self, pid):
+        return self.cache.lookup(pid)
+
+    def iter_processes(self):
+        for _, info in self.cache.iter_processes():
+            yield info
+
+    def kill(self, info):
+        process = psutil.Process(info.pid)
+        # Never kill a process that reused the pid since info was resolved
+        if info.create_time is not None and process.create_time() != info.create_time:
+            raise psutil.NoSuchProcess(info.pid, info.name)
+        process.kill()
+
+    def prune(self):
+        self.cache.prune()
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class SimulatedDesktop:
+    """Window table of a replayed desktop: hwnd -> (title, pid, minimized)."""
+
+    def __init__(self):
+        self.windows = {}
+        self.scans = 0
+
+    def set_window(self, hwnd, title, pid, minimized=False):
+        self.windows[hwnd] = (title, pid, bool(minimized))
+
+    def close_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+
+    def scan(self, table):
+        self.scans += 1
+        table.begin_snapshot()
+        for hwnd, (title, pid, minimized) in self.windows.items():
+            if title:
+                table.observe(hwnd, title, pid, minimized, True)
+        return table.end_snapshot()
+
+    def snapshot(self, hwnd):
+        window = self.windows.get(hwnd)
+        if window is None or not window[0]:
+            return None
+        title, pid, minimized = window
+        return WindowRecord(title, pid, minimized, True)
+
+    def capturable(self, hwnd):
+        return True
+
+
+class SimulatedProcessTable:
+    """Process table of a replay; kills are recorded as (pid, name)."""
+
+    def __init__(self):
+        self.processes = {}
+        self.kills = []
+
+    def start(self, pid, name, session_id=1, exe=None):
+        self.processes[pid] = ProcessInfo(pid, float(pid), name.lower(), exe, session_id)
+
+    def exit(self, pid):
+        self.processes.pop(pid, None)
+
+    def lookup(self, pid):
+        return self.processes.get(pid)
+
+    def iter_processes(self):
+        return list(self.processes.values())
+
+    def kill(self, info):
+        if self.processes.pop(info.pid, None) is None:
+            raise psutil.NoSuchProcess(info.pid, info.name)
+        self.kills.append((info.pid, info.name))
+
+    def kill_pid(self, pid, name=None):
+        info = self.processes.get(pid)
+        if info is None:
+            raise psutil.NoSuchProcess(pid, name)
+        self.kill(info)
+
+    def prune(self):
+        pass
+
+    def stats(self):
+        return {'processes': len(self.processes), 'kills': len(self.kills)}
+
+
+class SimulatedKeyboard:
+    """Records how often capture-key blocking is switched on and off."""
+
+    def __init__(self):
+        self.enabled = False
+        self.enables = 0
+        self.disables = 0
+
+    def enable(self):
+        self.enabled = True
+        self.enables += 1
+
+    def disable(self):
+        self.enabled = False
+        self.disables += 1
+
+    def stats(self):
+        return {'enabled': self.enabled, 'enables': self.enables, 'disables': self.disables}
+
+
+class StaticPolicySource:
+    """Policy holder with the PolicyWatcher interface (current) for replays."""
+
+    def __init__(self, policy):
+        self.current = policy
@@ -0,0 +1,527 @@
+"""Replay recorded or synthetic desktop timelines through the SVS decision code.
+
+A timeline is a JSON list (or JSON lines) of events ordered by t, in seconds:
+
+    {"t": 0.0,  "op": "start",  "pid": 4100, "name": "msedge.exe", "session": 1}
+    {"t": 2.5,  "op": "window", "hwnd": 10, "title": "SignPlus for OCBC Bank", "pid": 4100, "minimized": false}
+    {"t": 9.0,  "op": "close",  "hwnd": 10}
+    {"t": 12.0, "op": "exit",   "pid": 4100}
+
+The real DlpController runs against simulated providers, an in-memory
+registry and a simulated clock, in polling mode (one cycle every interval)
+or event mode (each window change is handled when it happens, plus the
+periodic resync). The report lists block/unblock decisions, enforcement
+actions, CPU time per cycle and detection latency in simulated time.
+
+    python dlp_replay.py [timeline.json] [--policy SVSDLPPolicy.json] [--mode poll|events]
+                         [--scope targeted|all_programs] [--compare-scope]
+                         [--json] [--max-cycle-cpu-ms N]
+
+Without a timeline a synthetic one is generated. --record timeline.json
+records the live desktop on Windows.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+
+import dlp_keywords
+from dlp_controller import DlpController
+from dlp_metrics import LoopMetrics
+from dlp_policy import compile_policy, load_policy, policy_keys, scopes, validate_policy
+from dlp_process_events import ProcessStartEnforcer, ProcessStartEvent, SimulatedProcessStartSource
+from dlp_providers import SimulatedDesktop, SimulatedKeyboard, SimulatedProcessTable, StaticPolicySource
+from dlp_registry import HivePolicyApplier, MemoryRegistryBackend, RegistryReconciler
+from dlp_window_events import EVENT_OBJECT_DESTROY, EVENT_OBJECT_NAMECHANGE, EventDrivenMonitor, WindowEvent
+
+logger = logging.getLogger(__name__)
+
+disallow_run_key_path = r"Software\Microsoft\Windows\CurrentVersion\Policies\Explorer\DisallowRun"
+
+# "exclude_windows" is a what-if: SetWindowDisplayAffinity only works on windows
+# owned by the calling process, so SVS cannot exclude browser or Java windows
+enforcement_modes = ("global", "exclude_windows")
+
+# Sample policy for replays run without --policy
+sample_policy = {
+    "browser_keywords": {
+        "msedge.exe": ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po",
+                       "SignPlus for OCBC Malaysia", "Digital Board Resolution"],
+        "chrome.exe": ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po",
+                       "SignPlus for OCBC Malaysia", "Digital Board Resolution"],
+    },
+    "specific_programs": ["javaw.exe", "java.exe"],
+    "other_keywords": ["SignPlus for OCBC Bank", "edit account", "new account", "new signatory"],
+    "blocked_tools": {"SnippingTool": "SnippingTool.exe", "StepsRecorder": "psr.exe",
+                      "ScreenClippingHost": "ScreenClippingHost.exe", "ScreenSketch": "ScreenSketch.exe"},
+}
+
+
+def load_timeline(path):
+    with open(path, encoding='utf-8') as file:
+        text = file.read()
+    if text.lstrip().startswith('['):
+        events = json.loads(text)
+    else:
+        events = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return sorted(events, key=lambda event: event["t"])
+
+
+def synthetic_timeline(duration=1800, window_count=40, sensitive_sessions=4, seed=7):
+    """Office desktop with title churn, minimizing, tool launches and a few sensitive sessions."""
+    rng = random.Random(seed)
+    events = [
+        {"t": 0.0, "op": "start", "pid": 100, "name": "winword.exe"},
+        {"t": 0.0, "op": "start", "pid": 200, "name": "msedge.exe"},
+        {"t": 0.0, "op": "start", "pid": 300, "name": "javaw.exe"},
+    ]
+    for hwnd in range(1, window_count + 1):
+        events.append({"t": 0.0, "op": "window", "hwnd": hwnd, "title": f"Document {hwnd} - Word",
+                       "pid": 100, "minimized": False})
+    next_pid = 1000
+    for _ in range(duration // 10):
+        t = round(rng.uniform(1, duration), 2)
+        hwnd = rng.randint(1, window_count)
+        events.append({"t": t, "op": "window", "hwnd": hwnd, "title": f"Document {hwnd} ({rng.randint(1, 99)}) - Word",
+                       "pid": 100, "minimized": rng.random() < 0.2})
+    for _ in range(duration // 120):
+        t = round(rng.uniform(1, duration), 2)
+        events.append({"t": t, "op": "start", "pid": next_pid, "name": rng.choice(["SnippingTool.exe", "notepad.exe"])})
+        events.append({"t": t + 30, "op": "exit", "pid": next_pid})
+        next_pid += 1
+    for index in range(sensitive_sessions):
+        start = round(duration * (index + 0.3) / sensitive_sessions, 2)
+        hwnd = 1000 + index
+        events.append({"t": start, "op": "window", "hwnd": hwnd, "title": "New Tab - Microsoft Edge",
+                       "pid": 200, "minimized": False})
+        # The title turns sensitive after navigation, is minimized for a while, then closed
+        events.append({"t": start + 3.3, "op": "window", "hwnd": hwnd,
+                       "title": "SignPlus for OCBC Bank - Microsoft Edge", "pid": 200, "minimized": False})
+        events.append({"t": start + 60, "op": "window", "hwnd": hwnd,
+                       "title": "SignPlus for OCBC Bank - Microsoft Edge", "pid": 200, "minimized": True})
+        events.append({"t": start + 90, "op": "window", "hwnd": hwnd,
+                       "title": "SignPlus for OCBC Bank - Microsoft Edge", "pid": 200, "minimized": False})
+        # Switching between the sensitive tab and others flips the title back and forth
+        for switch in range(3):
+            away = start + 100 + switch * 15
+            events.append({"t": away, "op": "window", "hwnd": hwnd, "title": "Inbox - Outlook - Microsoft Edge",
+                           "pid": 200, "minimized": False})
+            events.append({"t": away + 7, "op": "window", "hwnd": hwnd,
+                           "title": "SignPlus for OCBC Bank - Microsoft Edge", "pid": 200, "minimized": False})
+        events.append({"t": start + 150, "op": "close", "hwnd": hwnd})
+    return sorted(events, key=lambda event: event["t"])
+
+
+class SimulatedCaptureExclusion:
+    """Records excluded windows; windows of pids in refused_pids cannot be excluded."""
+
+    def __init__(self, desktop, refused_pids=()):
+        self.desktop = desktop
+        self.refused_pids = set(refused_pids)
+        self.excluded = set()
+        self.exclusions = 0
+        self.inclusions = 0
+
+    def exclude(self, hwnd):
+        window = self.desktop.windows.get(hwnd)
+        if window is None or window[1] in self.refused_pids:
+            raise PermissionError(f"cannot change display affinity of window {hwnd}")
+        self.excluded.add(hwnd)
+        self.exclusions += 1
+
+    def include(self, hwnd):
+        if hwnd not in self.excluded:
+            raise KeyError(hwnd)
+        self.excluded.discard(hwnd)
+        self.inclusions += 1
+
+
+class CaptureExclusionController(DlpController):
+    """DlpController that excludes sensitive windows from capture instead of blocking globally.
+
+    Sensitive windows are excluded as soon as they are evaluated, and global
+    enforcement only runs for windows that could not be excluded.
+    """
+
+    def __init__(self, *args, capture, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.capture = capture
+        self.excluded = set()
+        self.exclusion_failed = set()
+        self.exclusions = 0
+        self.exclusion_failures = 0
+        self.global_blocks_avoided = 0
+        self.raw_block_required = False
+
+    def evaluate_window(self, hwnd, record):
+        detected = super().evaluate_window(hwnd, record)
+        if detected is not None:
+            self.exclude_window(hwnd, detected[0], detected[1])
+        return detected
+
+    def exclude_window(self, hwnd, process_name, pid):
+        if hwnd in self.excluded:
+            return
+        try:
+            self.capture.exclude(hwnd)
+        except Exception as e:
+            if hwnd not in self.exclusion_failed:
+                self.exclusion_failed.add(hwnd)
+                self.exclusion_failures += 1
+                logger.warning(f"Cannot exclude window of {process_name} (PID: {pid}) from capture, "
+                               f"using global enforcement: {e}")
+            return
+        self.exclusion_failed.discard(hwnd)
+        self.excluded.add(hwnd)
+        self.exclusions += 1
+        logger.info(f"Excluded window of {process_name} (PID: {pid}) from screen capture")
+
+    def sync_exclusions(self):
+        """Lift the exclusion of windows that are no longer sensitive."""
+        blocking = self.window_table.blocking
+        for hwnd in [hwnd for hwnd in self.excluded if hwnd not in blocking]:
+            self.excluded.discard(hwnd)
+            try:
+                self.capture.include(hwnd)
+            except Exception:
+                pass  # The window is gone
+        self.exclusion_failed.intersection_update(blocking)
+
+    def apply_block_state(self, block_required, detected_by):
+        rising = block_required and not self.raw_block_required
+        self.raw_block_required = block_required
+        self.sync_exclusions()
+        # Excluded windows are protected on their own; only the rest need global enforcement
+        block_required = bool(self.exclusion_failed)
+        if block_required:
+            detected_by = self.window_table.blocking.get(next(iter(self.exclusion_failed)), detected_by)
+        elif rising:
+            self.global_blocks_avoided += 1
+        super().apply_block_state(block_required, detected_by)
+
+    def exclusion_stats(self):
+        return {
+            'excluded': len(self.excluded),
+            'exclusions': self.exclusions,
+            'exclusion_failures': self.exclusion_failures,
+            'global_blocks_avoided': self.global_blocks_avoided,
+        }
+
+
+class ReplayHarness:
+    """Drive DlpController through a timeline on a simulated clock."""
+
+    def __init__(self, timeline, policy, mode="poll", interval=5.0, sid="S-1-5-21-1000-1001",
+                 hold_down=15.0, min_dwell=30.0, enforcement_mode="global", refused_pids=()):
+        self.timeline = timeline
+        self.mode = mode
+        self.interval = interval
+        self.now = 0.0
+        self.desktop = SimulatedDesktop()
+        self.processes = SimulatedProcessTable()
+        self.keyboard = SimulatedKeyboard()
+        self.backend = MemoryRegistryBackend([sid])
+        reconciler = RegistryReconciler(HivePolicyApplier(self.backend, max_workers=1))
+        self.metrics = LoopMetrics(("enumerate", "resolve", "match", "enforce", "registry"),
+                                   latencies=("detection_to_block",))
+        args = (self.desktop, self.processes, self.keyboard, reconciler, StaticPolicySource(policy),
+                disallow_run_key_path, self.metrics)
+        kwargs = {"clock": lambda: self.now, "hold_down": hold_down, "min_dwell": min_dwell}
+        if enforcement_mode == "exclude_windows":
+            self.controller = CaptureExclusionController(
+                *args, capture=SimulatedCaptureExclusion(self.desktop, refused_pids), **kwargs)
+        else:
+            self.controller = DlpController(*args, **kwargs)
+        self.enforcer = ProcessStartEnforcer(SimulatedProcessStartSource(), policy.blocked_tool_names,
+                                             lambda pid, name, created: self.processes.kill_pid(pid, name))
+        self.controller.process_start_enforcer = self.enforcer
+        self.monitor = EventDrivenMonitor(None, self.controller.window_table, self.desktop.snapshot,
+                                          self.controller.apply_block_state)
+        # hwnd -> simulated time its current state was set, for detection latency
+        self.changed_at = {}
+        self.decisions = []
+        self.actions = []
+        self.cycle_cpu = []
+        self.event_cpu = []
+
+    def run(self):
+        self.controller.check_and_update_registry(False)
+        end = self.timeline[-1]["t"] + self.interval if self.timeline else 0
+        index = 0
+        next_cycle = 0.0
+        while next_cycle <= end:
+            while index < len(self.timeline) and self.timeline[index]["t"] <= next_cycle:
+                self.now = self.timeline[index]["t"]
+                self.apply_event(self.timeline[index])
+                index += 1
+            self.now = next_cycle
+            self.run_cycle()
+            next_cycle += self.interval
+        return self.report()
+
+    def apply_event(self, event):
+        op = event["op"]
+        if op == "window":
+            self.desktop.set_window(event["hwnd"], event["title"], event["pid"], event.get("minimized", False))
+            self.changed_at[event["hwnd"]] = event["t"]
+            self._window_event(EVENT_OBJECT_NAMECHANGE, event["hwnd"])
+        elif op == "close":
+            self.desktop.close_window(event["hwnd"])
+            self.changed_at.pop(event["hwnd"], None)
+            self._window_event(EVENT_OBJECT_DESTROY, event["hwnd"])
+        elif op == "start":
+            self.processes.start(event["pid"], event["name"], event.get("session", 1))
+            kills = len(self.processes.kills)
+            self.enforcer.handle(ProcessStartEvent(event["pid"], event["name"], None, None, time.time()))
+            self._record_kills(kills, "process start")
+        elif op == "exit":
+            self.processes.exit(event["pid"])
+
+    def run_cycle(self):
+        blocked, kills = self.controller.block_print_screen, len(self.processes.kills)
+        writes, deletes = self.backend.writes, self.backend.deletes
+        started = time.process_time()
+        if self.mode == "events":
+            self.controller.run_resync_cycle(self.monitor)
+        else:
+            self.controller.run_cycle()
+        self.cycle_cpu.append(time.process_time() - started)
+        self._record_transition(blocked)
+        self._record_kills(kills, "sweep")
+        if self.backend.writes != writes or self.backend.deletes != deletes:
+            self.actions.append({"t": self.now, "action": "registry", "writes": self.backend.writes - writes,
+                                 "deletes": self.backend.deletes - deletes})
+
+    def report(self):
+        latencies = [decision["latency"] for decision in self.decisions if decision.get("latency") is not None]
+        cycle_ms = [cpu * 1000 for cpu in self.cycle_cpu]
+        report = {
+            "mode": self.mode,
+            "events": len(self.timeline),
+            "cycles": len(self.cycle_cpu),
+            "decisions": self.decisions,
+            "blocks": sum(1 for decision in self.decisions if decision["decision"] == "block"),
+            "unblocks": sum(1 for decision in self.decisions if decision["decision"] == "unblock"),
+            "kills": len(self.processes.kills),
+            "registry_writes": self.backend.writes,
+            "registry_deletes": self.backend.deletes,
+            "key_blocking_enables": self.keyboard.enables,
+            "block_state": self.controller.hysteresis.stats(),
+            "actions": self.actions,
+            "cycle_cpu_ms": {
+                "median": statistics.median(cycle_ms) if cycle_ms else None,
+                "max": max(cycle_ms) if cycle_ms else None,
+                "total": sum(cycle_ms),
+            },
+            "event_cpu_ms_total": sum(self.event_cpu) * 1000,
+            "detection_latency_s": {
+                "median": statistics.median(latencies) if latencies else None,
+                "max": max(latencies) if latencies else None,
+            },
+            "evaluations": self.controller.window_table.evaluations,
+            "scope": self.controller.active_policy.scope,
+            "titles_matched": self.controller.titles_matched,
+        }
+        if isinstance(self.controller, CaptureExclusionController):
+            report["capture_exclusion"] = self.controller.exclusion_stats()
+        return report
+
+    def _window_event(self, event, hwnd):
+        if self.mode != "events":
+            return
+        blocked, kills = self.controller.block_print_screen, len(self.processes.kills)
+        started = time.process_time()
+        self.monitor.handle_event(WindowEvent(event, hwnd, time.perf_counter()))
+        self.event_cpu.append(time.process_time() - started)
+        self._record_transition(blocked)
+        self._record_kills(kills, "block")
+
+    def _record_transition(self, was_blocked):
+        blocked = self.controller.block_print_screen
+        if blocked == was_blocked:
+            return
+        decision = {"t": self.now, "decision": "block" if blocked else "unblock"}
+        if blocked:
+            detected = next(iter(self.controller.window_table.blocking.items()), None)
+            if detected:
+                hwnd, (process_name, pid, keyword) = detected
+                decision.update(process=process_name, pid=pid, keyword=keyword,
+                                latency=self.now - self.changed_at.get(hwnd, self.now))
+        self.decisions.append(decision)
+
+    def _record_kills(self, start, trigger):
+        for pid, name in self.processes.kills[start:]:
+            self.actions.append({"t": self.now, "action": "kill", "pid": pid, "name": name, "trigger": trigger})
+
+
+def with_scope(policy, scope, prefilter=True):
+    """Policy with its keyword scope replaced; prefilter=False rebuilds the shared matcher without it."""
+    default_matcher = policy.other_keywords_matcher if scope == "all_programs" else None
+    if default_matcher is not None and not prefilter:
+        limit, dlp_keywords.prefilter_limit = dlp_keywords.prefilter_limit, -1
+        default_matcher = dlp_keywords.KeywordMatcher(default_matcher.keywords)
+        dlp_keywords.prefilter_limit = limit
+    return policy._replace(scope=scope, default_matcher=default_matcher)
+
+
+def record_timeline(path, duration, interval=0.5):
+    """Record window and process changes of the live desktop (Windows only)."""
+    import psutil
+
+    from dlp_providers import Win32WindowProvider
+    from dlp_window_state import WindowStateTable
+
+    provider = Win32WindowProvider()
+    events = []
+    started = time.monotonic()
+    now = 0.0
+
+    def on_change(hwnd, record):
+        events.append({"t": now, "op": "window", "hwnd": hwnd, "title": record.title,
+                       "pid": record.pid, "minimized": record.minimized})
+
+    table = WindowStateTable(on_change)
+    processes = {}
+    while now <= duration:
+        now = round(time.monotonic() - started, 3)
+        current = {}
+        for process in psutil.process_iter(['name']):
+            current[process.pid] = process.info['name'] or ''
+        for pid, name in current.items():
+            if processes.get(pid) != name:
+                events.append({"t": now, "op": "start", "pid": pid, "name": name})
+        events.extend({"t": now, "op": "exit", "pid": pid} for pid in processes.keys() - current.keys())
+        processes = current
+        previous = set(table.windows)
+        provider.scan(table)
+        events.extend({"t": now, "op": "close", "hwnd": hwnd} for hwnd in previous - table.windows.keys())
+        time.sleep(interval)
+    with open(path, 'w', encoding='utf-8') as file:
+        for event in events:
+            file.write(json.dumps(event) + "\n")
+    print(f"recorded {len(events)} events over {duration} s to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("timeline", nargs="?", help="timeline file; a synthetic timeline is used if omitted")
+    parser.add_argument("--policy", help="policy JSON file (same format as SVSDLPPolicy.json)")
+    parser.add_argument("--mode", choices=("poll", "events"), default="poll")
+    parser.add_argument("--interval", type=float, default=5.0, help="cycle interval in simulated seconds")
+    parser.add_argument("--hold-down", type=float, default=15.0, help="seconds without a trigger before unblocking")
+    parser.add_argument("--min-dwell", type=float, default=30.0, help="minimum seconds a block stays in force")
+    parser.add_argument("--compare-hysteresis", action="store_true",
+                        help="also replay without hysteresis and print the enforcement work saved")
+    parser.add_argument("--enforcement-mode", choices=enforcement_modes, default="global",
+                        help="exclude_windows simulates excluding the sensitive windows from capture "
+                             "instead of blocking globally")
+    parser.add_argument("--refuse-exclusion-pid", type=int, action="append", default=[],
+                        help="simulate a process whose windows cannot be excluded from capture")
+    parser.add_argument("--compare-enforcement", action="store_true",
+                        help="also replay in global mode and print the enforcement work avoided")
+    parser.add_argument("--scope", choices=scopes, help="override the policy's keyword scope")
+    parser.add_argument("--compare-scope", action="store_true",
+                        help="replay the same desktop in every scope and print the matching cost of each")
+    parser.add_argument("--synthetic-duration", type=int, default=1800,
+                        help="length in seconds of the synthetic timeline")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    parser.add_argument("--max-cycle-cpu-ms", type=float, help="exit 1 if any cycle used more CPU than this")
+    parser.add_argument("--record", metavar="PATH", help="record the live desktop to PATH instead (Windows)")
+    parser.add_argument("--duration", type=float, default=300, help="recording duration in seconds")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_timeline(args.record, args.duration)
+        return 0
+
+    logging.disable(logging.WARNING)
+    defaults = validate_policy(sample_policy, {key: sample_policy[key] for key in policy_keys})
+    policy = load_policy(args.policy, defaults, 1) if args.policy else compile_policy(defaults)
+    if args.timeline:
+        timeline = load_timeline(args.timeline)
+    else:
+        timeline = synthetic_timeline(args.synthetic_duration, sensitive_sessions=max(args.synthetic_duration // 450, 1))
+    if args.scope:
+        policy = with_scope(policy, args.scope)
+    report = ReplayHarness(timeline, policy, args.mode, args.interval, hold_down=args.hold_down,
+                           min_dwell=args.min_dwell, enforcement_mode=args.enforcement_mode,
+                           refused_pids=args.refuse_exclusion_pid).run()
+    if args.compare_hysteresis:
+        baseline = ReplayHarness(timeline, policy, args.mode, args.interval, hold_down=0, min_dwell=0).run()
+        report["without_hysteresis"] = {key: baseline[key] for key in (
+            "blocks", "unblocks", "kills", "registry_writes", "registry_deletes", "key_blocking_enables")}
+    if args.compare_enforcement:
+        baseline = ReplayHarness(timeline, policy, args.mode, args.interval,
+                                 hold_down=args.hold_down, min_dwell=args.min_dwell).run()
+        report["global_enforcement"] = {key: baseline[key] for key in (
+            "blocks", "kills", "registry_writes", "registry_deletes", "key_blocking_enables", "cycle_cpu_ms")}
+    if args.compare_scope:
+        variants = [(scope, with_scope(policy, scope)) for scope in scopes]
+        variants.append(("all_programs without prefilter", with_scope(policy, "all_programs", prefilter=False)))
+        report["scopes"] = {}
+        for name, variant in variants:
+            # Best of 5 replays; the CPU totals are a few milliseconds
+            runs = [ReplayHarness(timeline, variant, args.mode, args.interval, hold_down=args.hold_down,
+                                  min_dwell=args.min_dwell).run() for _ in range(5)]
+            best = min(runs, key=lambda run: run["cycle_cpu_ms"]["total"] + run["event_cpu_ms_total"])
+            report["scopes"][name] = {key: best[key] for key in (
+                "blocks", "titles_matched", "evaluations", "cycle_cpu_ms", "event_cpu_ms_total")}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"mode: {report['mode']}, events: {report['events']}, cycles: {report['cycles']}, "
+              f"window evaluations: {report['evaluations']}")
+        for decision in report["decisions"]:
+            detail = (f" by {decision['process']} (PID: {decision['pid']}) keyword '{decision['keyword']}', "
+                      f"latency {decision['latency']:.1f} s" if "keyword" in decision else "")
+            print(f"  t={decision['t']:8.1f}  {decision['decision']}{detail}")
+        print(f"blocks: {report['blocks']}, unblocks: {report['unblocks']}, kills: {report['kills']}, "
+              f"registry writes/deletes: {report['registry_writes']}/{report['registry_deletes']}, "
+              f"key blocking enables: {report['key_blocking_enables']}")
+        block_state = report["block_state"]
+        print(f"block state: {block_state['trigger_changes']} trigger changes, "
+              f"{block_state['transitions']} enforced transitions")
+        if "without_hysteresis" in report:
+            baseline = report["without_hysteresis"]
+            print(f"without hysteresis: blocks: {baseline['blocks']}, unblocks: {baseline['unblocks']}, "
+                  f"kills: {baseline['kills']}, registry writes/deletes: "
+                  f"{baseline['registry_writes']}/{baseline['registry_deletes']}, "
+                  f"key blocking enables: {baseline['key_blocking_enables']}")
+            saved = (baseline["registry_writes"] + baseline["registry_deletes"]
+                     - report["registry_writes"] - report["registry_deletes"])
+            print(f"hysteresis saved {saved} registry operations, "
+                  f"{baseline['blocks'] - report['blocks']} block/unblock cycles")
+        if "capture_exclusion" in report:
+            exclusion = report["capture_exclusion"]
+            print(f"capture exclusion (simulated): {exclusion['exclusions']} windows excluded, "
+                  f"{exclusion['exclusion_failures']} refused, "
+                  f"{exclusion['global_blocks_avoided']} global blocks avoided")
+        if "global_enforcement" in report:
+            baseline = report["global_enforcement"]
+            print(f"global mode: blocks: {baseline['blocks']}, kills: {baseline['kills']}, registry writes/deletes: "
+                  f"{baseline['registry_writes']}/{baseline['registry_deletes']}, "
+                  f"key blocking enables: {baseline['key_blocking_enables']}, "
+                  f"cycle cpu total {baseline['cycle_cpu_ms']['total']:.1f} ms")
+        for name, variant in report.get("scopes", {}).items():
+            print(f"scope {name}: blocks: {variant['blocks']}, titles matched: {variant['titles_matched']} "
+                  f"of {variant['evaluations']} evaluations, cpu total "
+                  f"{variant['cycle_cpu_ms']['total'] + variant['event_cpu_ms_total']:.1f} ms")
+        cpu = report["cycle_cpu_ms"]
+        print(f"cycle cpu: median {cpu['median']:.3f} ms, max {cpu['max']:.3f} ms, total {cpu['total']:.1f} ms"
+              + (f", event handling {report['event_cpu_ms_total']:.1f} ms" if report["mode"] == "events" else ""))
+        latency = report["detection_latency_s"]
+        if latency["median"] is not None:
+            print(f"detection latency (simulated): median {latency['median']:.2f} s, max {latency['max']:.2f} s")
+
+    if args.max_cycle_cpu_ms is not None and report["cycle_cpu_ms"]["max"] > args.max_cycle_cpu_ms:
+        print(f"FAIL: cycle cpu {report['cycle_cpu_ms']['max']:.3f} ms exceeds {args.max_cycle_cpu_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""Per-session block state for terminal servers and the session helper pipe.
+
+On an RDS/Citrix host every interactive session runs a small helper
+(SVS.py --session-helper) that enumerates its own desktop and owns its
+Print Screen hook. Helpers report their windows to one central engine
+(SVS.py --session-engine) over a local named pipe. The engine keeps a window
+table and block state per session and enforces only inside the session that
+triggered: that user's hive is written and that session's processes are
+killed.
+
+Messages are JSON objects, one per pipe message:
+
+    helper -> engine  {"op": "windows", "windows": [[hwnd, title, pid, minimized], ...]}
+                      {"op": "heartbeat"}
+    engine -> helper  {"op": "state", "block": true}
+
+The helper sends its window list only when it changed. The session id and
+user SID are taken from the pipe client, never from the message, so a helper
+cannot act on behalf of another session.
+"""
+import ctypes
+import json
+import logging
+import threading
+import time
+
+from dlp_window_state import WindowStateTable
+
+logger = logging.getLogger(__name__)
+
+engine_pipe_name = r"\\.\pipe\SVSDLPSessionEngine"
+
+# SYSTEM and administrators own the pipe; signed-in users may only read and write it
+engine_pipe_sddl = "D:(A;;GA;;;SY)(A;;GA;;;BA)(A;;GRGW;;;AU)"
+
+PIPE_BUFFER_SIZE = 65536
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+ERROR_MORE_DATA = 234
+ERROR_PIPE_CONNECTED = 535
+
+
+class SessionState:
+    """Window table and block state of one interactive session."""
+
+    def __init__(self, session_id, user_sid, evaluate):
+        self.session_id = session_id
+        self.user_sid = user_sid
+        self.table = WindowStateTable(lambda hwnd, record: evaluate(self, hwnd, record))
+        self.block_required = False
+        self.detected_by = None
+        self.transitions = 0
+        self.messages = 0
+        self.connections = 0
+        self.last_seen = time.monotonic()
+        # Blocked when its helper vanished; stays blocked until logoff or a clean report
+        self.orphaned = False
+
+
+class SessionEngine:
+    """Central decision engine holding one SessionState per connected session.
+
+    evaluate(state, hwnd, record) returns a detection tuple (process_name, pid,
+    keyword) or None; on_change(state) is called whenever block_required of a
+    session flips. on_close(state), if given, is called once a session is gone,
+    e.g. at logoff.
+
+    Helpers run as the signed-in user, who can end them. A blocked session
+    whose helper disconnects or goes silent therefore stays blocked (and is
+    logged as possible tampering) until logged_on(session_id, user_sid)
+    reports it signed off or a new helper reports a desktop without
+    sensitive windows.
+    """
+
+    def __init__(self, evaluate, on_change, on_close=None, logged_on=None):
+        self.evaluate = evaluate
+        self.on_change = on_change
+        self.on_close = on_close
+        self.logged_on = logged_on or session_logged_on
+        self.sessions = {}
+        self.lock = threading.RLock()
+        self.messages = 0
+        self.rejected = 0
+        self.tampering = 0
+
+    def connect(self, session_id, user_sid):
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is not None and state.user_sid != user_sid:
+                # The session id was reused by a different user
+                self.close_session(session_id)
+                state = None
+            if state is None:
+                state = self.sessions[session_id] = SessionState(session_id, user_sid, self.evaluate)
+                logger.info(f"Session {session_id} ({user_sid}) connected")
+            state.connections += 1
+            return state
+
+    def disconnect(self, session_id):
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None:
+                return
+            state.connections -= 1
+            if state.connections <= 0:
+                self._helper_lost(state, "disconnected")
+
+    def close_session(self, session_id):
+        with self.lock:
+            state = self.sessions.pop(session_id, None)
+            if state is None:
+                return
+            state.table.clear()
+            self._publish(state)
+            logger.info(f"Session {session_id} ({state.user_sid}) disconnected")
+            if self.on_close:
+                self.on_close(state)
+
+    def expire(self, max_age):
+        """Close sessions whose helper has not reported for max_age seconds and orphans that logged off."""
+        with self.lock:
+            deadline = time.monotonic() - max_age
+            for state in list(self.sessions.values()):
+                if state.orphaned:
+                    if not self.logged_on(state.session_id, state.user_sid):
+                        logger.info(f"Blocked session {state.session_id} ({state.user_sid}) logged off")
+                        self.close_session(state.session_id)
+                elif state.last_seen < deadline:
+                    self._helper_lost(state, "stopped reporting")
+
+    def _helper_lost(self, state, how):
+        if state.block_required and self.logged_on(state.session_id, state.user_sid):
+            self.tampering += 1
+            state.orphaned = True
+            logger.warning(f"Possible tampering: helper of blocked session {state.session_id} ({state.user_sid}) "
+                           f"{how}; keeping the session blocked until it logs off or a helper reports again")
+            return
+        if how != "disconnected":
+            logger.warning(f"Session {state.session_id} helper {how}")
+        self.close_session(state.session_id)
+
+    def handle_message(self, session_id, message):
+        """Apply one helper message to its session; returns the reply message."""
+        with self.lock:
+            state = self.sessions[session_id]
+            state.messages += 1
+            state.last_seen = time.monotonic()
+            self.messages += 1
+            if message.get("op") == "windows":
+                table = state.table
+                table.begin_snapshot()
+                for hwnd, title, pid, minimized in message["windows"]:
+                    if not isinstance(title, str):
+                        raise ValueError("window title must be a string")
+                    table.observe(int(hwnd), title, int(pid), bool(minimized), True)
+                table.end_snapshot()
+                self._publish(state)
+                if state.orphaned:
+                    state.orphaned = False
+                    logger.info(f"Helper of session {session_id} reporting again, blocked: {state.block_required}")
+            return {"op": "state", "block": state.block_required}
+
+    def handle_bytes(self, session_id, data):
+        """Decode, apply and answer one raw pipe message."""
+        try:
+            reply = self.handle_message(session_id, json.loads(data))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.rejected += 1
+            logger.error(f"Rejected message from session {session_id}: {e}")
+            state = self.sessions.get(session_id)
+            reply = {"op": "state", "block": bool(state and state.block_required)}
+        return json.dumps(reply).encode('utf-8')
+
+    def reevaluate(self):
+        """Re-run the evaluator on every session's windows, e.g. after a policy change."""
+        with self.lock:
+            for state in list(self.sessions.values()):
+                state.table.reevaluate()
+                self._publish(state)
+
+    def blocked_sessions(self):
+        # Called from the process start enforcer thread as well as under the engine loop
+        with self.lock:
+            return frozenset(session_id for session_id, state in self.sessions.items() if state.block_required)
+
+    def stats(self):
+        return {
+            'sessions': len(self.sessions),
+            'blocked_sessions': len(self.blocked_sessions()),
+            'messages': self.messages,
+            'rejected': self.rejected,
+            'orphaned': sum(state.orphaned for state in self.sessions.values()),
+            'tampering': self.tampering,
+            'transitions': sum(state.transitions for state in self.sessions.values()),
+        }
+
+    def _publish(self, state):
+        block_required = state.table.block_required
+        state.detected_by = state.table.detected_by()
+        if block_required != state.block_required:
+            state.block_required = block_required
+            state.transitions += 1
+            self.on_change(state)
+
+
+def pipe_client_session_id(handle):
+    session_id = ctypes.c_ulong()
+    if not ctypes.windll.kernel32.GetNamedPipeClientSessionId(int(handle), ctypes.byref(session_id)):
+        raise ctypes.WinError()
+    return session_id.value
+
+
+def session_user_sid(session_id):
+    """Return the string SID of the user signed in to a session (requires SYSTEM)."""
+    import win32security
+    import win32ts
+
+    token = win32ts.WTSQueryUserToken(session_id)
+    try:
+        sid = win32security.GetTokenInformation(token, win32security.TokenUser)[0]
+        return win32security.ConvertSidToStringSid(sid)
+    finally:
+        token.Close()
+
+
+def session_logged_on(session_id, user_sid):
+    """True if user_sid is still signed in to the session; any query failure counts as logged off."""
+    try:
+        return session_user_sid(session_id) == user_sid
+    except Exception:
+        return False
+
+
+def read_pipe_message(handle):
+    import win32file
+
+    chunks = []
+    size = 0
+    while True:
+        result, data = win32file.ReadFile(handle, PIPE_BUFFER_SIZE)
+        chunks.append(data)
+        size += len(data)
+        if size > MAX_MESSAGE_SIZE:
+            raise ValueError(f"pipe message exceeds {MAX_MESSAGE_SIZE} bytes")
+        if result != ERROR_MORE_DATA:
+            return b"".join(chunks)
+
+
+class NamedPipeSessionServer:
+    """Accept helper connections on the engine pipe, one thread per connection."""
+
+    def __init__(self, engine, pipe_name=engine_pipe_name, user_sid_of=session_user_sid):
+        self.engine = engine
+        self.pipe_name = pipe_name
+        self.user_sid_of = user_sid_of
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept_loop, name="SessionPipeServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _accept_loop(self):
+        import pywintypes
+        import win32file
+        import win32pipe
+        import win32security
+
+        attributes = win32security.SECURITY_ATTRIBUTES()
+        attributes.SECURITY_DESCRIPTOR = win32security.ConvertStringSecurityDescriptorToSecurityDescriptor(
+            engine_pipe_sddl, win32security.SDDL_REVISION_1)
+        # The first instance must be ours, so another process cannot squat on the pipe name
+        open_mode = win32pipe.PIPE_ACCESS_DUPLEX | win32file.FILE_FLAG_FIRST_PIPE_INSTANCE
+        pipe_mode = win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT
+
+        while not self._stop.is_set():
+            try:
+                handle = win32pipe.CreateNamedPipe(
+                    self.pipe_name, open_mode, pipe_mode, win32pipe.PIPE_UNLIMITED_INSTANCES,
+                    PIPE_BUFFER_SIZE, PIPE_BUFFER_SIZE, 0, attributes)
+            except pywintypes.error as e:
+                logger.error(f"Error creating pipe {self.pipe_name}: {e}")
+                time.sleep(1)
+                continue
+            open_mode = win32pipe.PIPE_ACCESS_DUPLEX
+            try:
+                win32pipe.ConnectNamedPipe(handle, None)
+            except pywintypes.error as e:
+                if e.winerror != ERROR_PIPE_CONNECTED:
+                    logger.error(f"Error accepting helper connection: {e}")
+                    handle.Close()
+                    continue
+            threading.Thread(target=self._serve, args=(handle,), name="SessionPipeClient", daemon=True).start()
+
+    def _serve(self, handle):
+        import pywintypes
+        import win32file
+        import win32pipe
+
+        session_id = None
+        try:
+            client_session = pipe_client_session_id(handle)
+            self.engine.connect(client_session, self.user_sid_of(client_session))
+            session_id = client_session
+            while not self._stop.is_set():
+                data = read_pipe_message(handle)
+                win32file.WriteFile(handle, self.engine.handle_bytes(session_id, data))
+        except pywintypes.error:
+            pass  # Helper exited or the session logged off
+        except Exception as e:
+            logger.error(f"Error serving session {session_id}: {e}")
+        finally:
+            if session_id is not None:
+                self.engine.disconnect(session_id)
+            try:
+                win32pipe.DisconnectNamedPipe(handle)
+            except pywintypes.error:
+                pass
+            handle.Close()
+
+
+class NamedPipeSessionClient:
+    """Helper side of the engine pipe."""
+
+    def __init__(self, pipe_name=engine_pipe_name):
+        self.pipe_name = pipe_name
+        self.handle = None
+
+    def connect(self):
+        import win32file
+        import win32pipe
+
+        self.handle = win32file.CreateFile(
+            self.pipe_name, win32file.GENERIC_READ | win32file.GENERIC_WRITE, 0, None,
+            win32file.OPEN_EXISTING, 0, None)
+        win32pipe.SetNamedPipeHandleState(self.handle, win32pipe.PIPE_READMODE_MESSAGE, None, None)
+
+    def request(self, message):
+        import win32file
+
+        win32file.WriteFile(self.handle, json.dumps(message).encode('utf-8'))
+        return json.loads(read_pipe_message(self.handle))
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.Close()
+            self.handle = None
+
+
+def run_benchmark(session_count=60, windows_per_session=40, cycles=120, trigger_session=17):
+    """Simulate helpers of many sessions reporting to one engine; only one session triggers."""
+    import statistics
+
+    from dlp_keywords import compile_process_keywords
+    from dlp_registry import REG_SZ, HivePolicyApplier, MemoryRegistryBackend, RegistryReconciler
+
+    disallow_path = r"Software\Microsoft\Windows\CurrentVersion\Policies\Explorer\DisallowRun"
+    tools = {"SnippingTool": "SnippingTool.exe", "StepsRecorder": "psr.exe", "ScreenSketch": "ScreenSketch.exe"}
+    blocked_names = frozenset(exe.lower() for exe in tools.values())
+    matchers = compile_process_keywords(
+        {"msedge.exe": ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po"]},
+        ["javaw.exe"], ["edit account", "new signatory"])
+
+    sids = {session: f"S-1-5-21-1000-{1000 + session}" for session in range(1, session_count + 1)}
+    backend = MemoryRegistryBackend(sids.values())
+    reconciler = RegistryReconciler(HivePolicyApplier(backend))
+    for name in tools:
+        reconciler.remove_value(disallow_path, name)
+    reconciler.reconcile()
+
+    # pid -> (name, session); every session has its own browser, Word and Snipping Tool
+    processes = {}
+    desktops = {}
+    for session in sids:
+        base = session * 1000
+        processes[base] = ("msedge.exe", session)
+        processes[base + 1] = ("winword.exe", session)
+        processes[base + 2] = ("snippingtool.exe", session)
+        desktops[session] = [[base * 10 + i, f"Document {i} - Word", base + 1, False]
+                             for i in range(windows_per_session)]
+    killed = []
+    transition_times = []
+
+    def evaluate(state, hwnd, record):
+        name, session = processes.get(record.pid, (None, None))
+        if session != state.session_id or record.minimized:
+            return None
+        matcher = matchers.get(name)
+        keyword = matcher.search(record.title) if matcher else None
+        return (name, record.pid, keyword) if keyword else None
+
+    def on_change(state):
+        for name, data in tools.items():
+            if state.block_required:
+                reconciler.set_hive_value(state.user_sid, disallow_path, name, data, REG_SZ)
+            else:
+                reconciler.remove_hive_value(state.user_sid, disallow_path, name)
+        reconciler.reconcile()
+        if state.block_required:
+            killed.extend(pid for pid, (name, session) in processes.items()
+                          if session == state.session_id and name in blocked_names)
+        transition_times.append(time.perf_counter())
+
+    signed_in = set(sids)
+    engine = SessionEngine(evaluate, on_change, logged_on=lambda session_id, user_sid: session_id in signed_in)
+    for session, sid in sids.items():
+        engine.connect(session, sid)
+
+    cycle_times = []
+    trigger_latency = None
+    blocked_hives = None
+    writes_before = backend.writes
+    for cycle in range(cycles):
+        changed = set(sids) if cycle == 0 else {session for session in sids if (session + cycle) % 4 == 0}
+        if cycle == cycles // 4:
+            desktops[trigger_session][0] = [trigger_session * 10000, "SignPlus for OCBC Bank - Microsoft Edge",
+                                            trigger_session * 1000, False]
+            changed.add(trigger_session)
+        if cycle == cycles * 3 // 4:
+            del desktops[trigger_session][0]
+            changed.add(trigger_session)
+        for session in changed:
+            # Ordinary churn: one window title per reporting session changes
+            desktops[session][-1][1] = f"Document {cycle} - Word"
+
+        started = time.perf_counter()
+        for session in sids:
+            if session in changed:
+                message = {"op": "windows", "windows": desktops[session]}
+            else:
+                message = {"op": "heartbeat"}
+            sent = time.perf_counter()
+            json.loads(engine.handle_bytes(session, json.dumps(message).encode('utf-8')))
+            if cycle == cycles // 4 and session == trigger_session:
+                trigger_latency = transition_times[-1] - sent
+                blocked_hives = [sid for sid, hive in backend.hives.items() if hive.get(disallow_path)]
+        reconciler.reconcile()
+        cycle_times.append(time.perf_counter() - started)
+
+    killed_sessions = sorted({processes[pid][1] for pid in killed})
+    print(f"sessions: {session_count}, windows per session: {windows_per_session}, cycles: {cycles}")
+    print(f"engine time per cycle (all sessions): median {statistics.median(cycle_times) * 1000:.2f} ms, "
+          f"max {max(cycle_times) * 1000:.2f} ms")
+    print(f"trigger to session block applied: {trigger_latency * 1000:.2f} ms")
+    print(f"hives with DisallowRun values while blocked: {len(blocked_hives)} "
+          f"({', '.join(blocked_hives)})")
+    print(f"sessions with killed processes: {killed_sessions}")
+    print(f"registry writes: {backend.writes - writes_before} session-scoped vs "
+          f"{session_count * len(tools)} for one global block")
+    # The user of a blocked session ends their helper; the block must survive until logoff
+    desktops[trigger_session][0] = [trigger_session * 10000, "SignPlus for OCBC Bank - Microsoft Edge",
+                                    trigger_session * 1000, False]
+    engine.handle_message(trigger_session, {"op": "windows", "windows": desktops[trigger_session]})
+    engine.disconnect(trigger_session)
+    engine.expire(3600)
+    after_kill = trigger_session in engine.blocked_sessions()
+    signed_in.discard(trigger_session)
+    engine.expire(3600)
+    after_logoff = trigger_session in engine.blocked_sessions()
+    print(f"helper of a blocked session killed: still blocked {after_kill}, blocked after logoff {after_logoff}")
+    print(f"engine stats: {engine.stats()}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    run_benchmark()
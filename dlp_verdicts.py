@@ -0,0 +1,128 @@
+"""Per-process verdict memo for AppControl sweeps.
+
+A process's executable and version info do not change while it runs, so
+its blocklist verdict is kept per (pid, create_time) together with the
+policy generation it was reached under. A sweep skips processes with a
+current verdict and evaluates only new ones, or all of them once after a
+policy change. A reused pid has a different create_time and misses.
+Entries of exited processes are evicted after every sweep, and the memo is
+bounded in case a sweep is cut short.
+"""
+import time
+from collections import OrderedDict
+
+
+class VerdictMemo:
+    """Bounded LRU of {(pid, create_time): (generation, verdict)}."""
+
+    def __init__(self, max_entries=8192):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, pid, create_time, generation):
+        """Return the verdict for the process under generation, or None."""
+        entry = self.entries.get((pid, create_time))
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != generation:
+            # Reached under an older policy
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end((pid, create_time))
+        return entry[1]
+
+    def put(self, pid, create_time, generation, verdict):
+        if create_time is None:
+            # Without a start time a reused pid cannot be told apart
+            return
+        self.entries[(pid, create_time)] = (generation, verdict)
+        self.entries.move_to_end((pid, create_time))
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def retain(self, live):
+        """Evict the entries of processes missing from live, a set of (pid, create_time)."""
+        for key in [key for key in self.entries if key not in live]:
+            del self.entries[key]
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def run_benchmark(process_counts=(300, 1000, 3000), new_per_cycle=5, cycles=50):
+    """Steady-state sweep cost with and without the memo as the process count grows.
+
+    Each cycle starts new_per_cycle processes and ends as many. Evaluating a
+    process here is a version-info cache hit plus a blocklist lookup, the
+    cheapest it gets in AppControl; a cold read of the version resource
+    costs far more.
+    """
+    import itertools
+
+    from dlp_blocklist import BlocklistIndex, synthetic_rows
+
+    blocklist = BlocklistIndex(synthetic_rows(500))
+    version_info = {}
+
+    def evaluate(pid):
+        # exe lookup and cached version info of the process
+        props = version_info.setdefault(pid % 400, {
+            "OriginalFilename": f"app{pid % 400}.exe", "ProductName": f"Product {pid % 400}",
+            "CompanyName": "Vendor", "FileDescription": "Application", "Type": "Application"})
+        return "blocked" if blocklist.match(props) else "allowed"
+
+    for count in process_counts:
+        pids = itertools.count(1000)
+        table = {next(pids): time.time() for _ in range(count)}
+        memo = VerdictMemo()
+        results = {}
+        for name in ("no memo", "memo"):
+            evaluations = 0
+            elapsed = 0.0
+            for cycle in range(cycles + 1):
+                for pid in list(table)[:new_per_cycle]:
+                    del table[pid]
+                for _ in range(new_per_cycle):
+                    table[next(pids)] = time.time()
+                started = time.perf_counter()
+                live = set()
+                for pid, create_time in table.items():
+                    if name == "memo":
+                        live.add((pid, create_time))
+                        if memo.get(pid, create_time, blocklist.generation) is not None:
+                            continue
+                    verdict = evaluate(pid)
+                    evaluations += cycle > 0
+                    if name == "memo":
+                        memo.put(pid, create_time, blocklist.generation, verdict)
+                if name == "memo":
+                    memo.retain(live)
+                if cycle:
+                    # The first cycle evaluates everything either way
+                    elapsed += time.perf_counter() - started
+            results[name] = (elapsed / cycles, evaluations / cycles)
+        print(f"processes {count:>5}: no memo {results['no memo'][0] * 1000:6.2f} ms "
+              f"({results['no memo'][1]:.0f} evaluations), memo {results['memo'][0] * 1000:6.2f} ms "
+              f"({results['memo'][1]:.0f} evaluations) per steady cycle with {new_per_cycle} new processes, "
+              f"memo entries {len(memo.entries)}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,144 @@
+"""Version-info cache for AppControl's executable matching.
+
+Reading an executable's version resource (GetFileVersionInfoSize,
+GetFileVersionInfo, VerQueryValue) hits the disk, so VersionInfoCache keeps
+the parsed properties per (normalized path, size, mtime) in a bounded LRU
+shared across sweeps. A file replaced in place changes size or mtime and is
+read again; the stale entry ages out of the LRU.
+"""
+import os
+import time
+from collections import OrderedDict
+
+
+class VersionInfoCache:
+    """LRU of loader(path) results keyed by (normalized path, size, mtime).
+
+    loader returns a properties dict, or None on a read error; errors are
+    not cached so a transient failure is retried on the next sweep.
+    """
+
+    def __init__(self, loader, max_entries=2048, stat=os.stat):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.stat = stat
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stat_failures = 0
+        self.load_failures = 0
+
+    def get(self, path):
+        """Return the cached properties of the file at path, loading them on a miss."""
+        try:
+            stat = self.stat(path)
+        except OSError:
+            self.stat_failures += 1
+            return None
+        key = (os.path.normcase(os.path.normpath(path)), stat.st_size, stat.st_mtime_ns)
+        props = self.entries.get(key)
+        if props is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return props
+
+        self.misses += 1
+        props = self.loader(path)
+        if props is None:
+            self.load_failures += 1
+            return None
+        self.entries[key] = props
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return props
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'stat_failures': self.stat_failures,
+            'load_failures': self.load_failures,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def run_benchmark(process_count=300, row_count=500, cycles=5):
+    """Per-cycle matching time of a re-read per blocklist row vs the cached record.
+
+    The loader reads the first 64 KB of a real file (the version resource is
+    read the same way, from the page cache once warm), so the numbers hold
+    file I/O cost but not the Windows version API parsing on top of it.
+    """
+    import random
+    import tempfile
+
+    keys = ("OriginalFilename", "ProductName", "CompanyName", "FileDescription", "Type")
+    rng = random.Random(11)
+    rows = [{"OriginalFilename": f"tool{i}.exe", "ProductName": rng.choice(["*", f"Product {i}"]),
+             "CompanyName": rng.choice(["*", f"Vendor {i % 40}"]), "FileDescription": "*", "Type": "Application"}
+            for i in range(row_count)]
+    loads = 0
+
+    def load(path):
+        nonlocal loads
+        loads += 1
+        with open(path, 'rb') as file:
+            data = file.read(65536)
+        index = data[:8].decode()
+        return {"OriginalFilename": f"app{index}.exe", "ProductName": f"Product {index}",
+                "CompanyName": f"Vendor {index}", "FileDescription": "Application", "Type": "Application"}
+
+    def row_matches(props, row):
+        for key in keys:
+            app_value = row[key]
+            prop_value = props[key]
+            if not (app_value == '*' or app_value.lower() == (prop_value.lower() if prop_value else '')):
+                return False
+        return True
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(process_count):
+            path = os.path.join(directory, f"app{i}.exe")
+            with open(path, 'wb') as file:
+                file.write(f"{i:08d}".encode() + os.urandom(65536))
+            paths.append(path)
+
+        def per_row_cycle():
+            # AppControl before the cache: the version info is re-read for every row
+            for path in paths:
+                for row in rows:
+                    if row_matches(load(path), row):
+                        break
+
+        cache = VersionInfoCache(load)
+
+        def cached_cycle():
+            for path in paths:
+                props = cache.get(path)
+                for row in rows:
+                    if row_matches(props, row):
+                        break
+
+        for name, cycle in (("re-read per row", per_row_cycle), ("cached record", cached_cycle)):
+            loads = 0
+            timings = []
+            for _ in range(cycles):
+                started = time.perf_counter()
+                cycle()
+                timings.append(time.perf_counter() - started)
+            print(f"{name:16}: first cycle {timings[0] * 1000:8.1f} ms, steady cycle "
+                  f"{min(timings[1:]) * 1000:8.1f} ms, version reads {loads} over {cycles} cycles")
+        print(f"{process_count} processes x {row_count} rows, cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,316 @@
+"""Window event sources and the event-driven monitor used by SVS.
+
+The monitor re-evaluates only the window named by each event instead of
+re-enumerating the whole desktop. Event sources are pluggable: the
+WinEventHookSource listens to the real desktop, the ReplayWindowEventSource
+feeds a scripted timeline so the monitor can be benchmarked off Windows.
+"""
+import ctypes
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from dlp_window_state import WindowRecord, WindowStateTable
+
+# WinEvent constants (winuser.h)
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+EVENT_OBJECT_NAMECHANGE = 0x800C
+EVENT_OBJECT_CLOAKED = 0x8017
+EVENT_OBJECT_UNCLOAKED = 0x8018
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+GA_ROOT = 2
+WM_QUIT = 0x0012
+
+# Event ranges registered with SetWinEventHook
+hooked_event_ranges = [
+    (EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND),
+    (EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND),
+    (EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE),
+    (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE),
+]
+
+# Also needed when the window provider prunes cloaked or off-screen windows: a
+# virtual-desktop switch or a move can bring a pruned window into view
+placement_event_ranges = [
+    (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_LOCATIONCHANGE),
+    (EVENT_OBJECT_CLOAKED, EVENT_OBJECT_UNCLOAKED),
+]
+placement_events = (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_CLOAKED, EVENT_OBJECT_UNCLOAKED)
+
+# Events after which the window can no longer require blocking
+removal_events = (EVENT_OBJECT_DESTROY, EVENT_OBJECT_HIDE)
+
+# timestamp is time.perf_counter() when the event was received
+WindowEvent = namedtuple('WindowEvent', ['event', 'hwnd', 'timestamp'])
+
+
+class WinEventHookSource:
+    """Deliver top-level window events from SetWinEventHook on a dedicated thread."""
+
+    def __init__(self, max_queue=10000, event_ranges=hooked_event_ranges):
+        self.event_ranges = event_ranges
+        self.events = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._error = None
+        self._callback = None
+
+    def start(self, timeout=5):
+        self._thread = threading.Thread(target=self._run, name="WinEventHook", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        if self._thread_id:
+            ctypes.WinDLL('user32').PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+
+    def get(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32')
+        WINEVENTPROC = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WINEVENTPROC,
+            wintypes.DWORD, wintypes.DWORD, wintypes.DWORD]
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+
+        def callback(hook, event, hwnd, id_object, id_child, thread, event_time):
+            # Only whole top-level windows are of interest, not child controls
+            if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+                return
+            if event != EVENT_OBJECT_DESTROY and user32.GetAncestor(hwnd, GA_ROOT) != hwnd:
+                return
+            try:
+                self.events.put_nowait(WindowEvent(event, hwnd, time.perf_counter()))
+            except queue.Full:
+                self.dropped += 1
+
+        self._callback = WINEVENTPROC(callback)
+        hooks = []
+        for event_min, event_max in self.event_ranges:
+            hook = user32.SetWinEventHook(
+                event_min, event_max, None, self._callback, 0, 0,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS)
+            if not hook:
+                self._error = ctypes.WinError(ctypes.get_last_error())
+                break
+            hooks.append(hook)
+
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        if not self._error:
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+
+class ReplayWindowEventSource:
+    """Replayable in-process event source for benchmarks and non-Windows CI."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.dropped = 0
+        self._thread = None
+
+    def start(self, timeout=5):
+        pass
+
+    def stop(self):
+        pass
+
+    def push(self, event, hwnd):
+        self.events.put(WindowEvent(event, hwnd, time.perf_counter()))
+
+    def replay(self, timeline, on_emit=None):
+        """Push (delay_seconds, event, hwnd) entries from a background thread."""
+        def run():
+            for delay, event, hwnd in timeline:
+                if delay:
+                    time.sleep(delay)
+                if on_emit:
+                    on_emit(event, hwnd)
+                self.push(event, hwnd)
+
+        self._thread = threading.Thread(target=run, name="WindowEventReplay", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def get(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class EventDrivenMonitor:
+    """Keep a WindowStateTable up to date from window events.
+
+    snapshot_window(hwnd) returns the current WindowRecord of a window, or None
+    if it no longer qualifies. on_change(block_required, detected_by) is called
+    only when the overall block decision flips.
+    """
+
+    def __init__(self, source, table, snapshot_window, on_change):
+        self.source = source
+        self.table = table
+        self.snapshot_window = snapshot_window
+        self.on_change = on_change
+        self.block_required = False
+        self.events_processed = 0
+        self.cpu_time = 0.0
+        self.last_latency = None
+
+    def resync(self, snapshot):
+        """Diff a full {hwnd: WindowRecord} enumeration against the table."""
+        self.table.apply_snapshot(snapshot)
+        self._publish()
+
+    def rescan(self, scan):
+        """Resync by letting scan(table) observe every window in place."""
+        scan(self.table)
+        self._publish()
+
+    def handle_event(self, window_event):
+        started = time.process_time()
+        hwnd = window_event.hwnd
+        if window_event.event in removal_events:
+            self.table.update(hwnd, None)
+        else:
+            self.table.update(hwnd, self.snapshot_window(hwnd))
+        self.events_processed += 1
+        self._publish()
+        self.last_latency = time.perf_counter() - window_event.timestamp
+        self.cpu_time += time.process_time() - started
+
+    def process_pending(self, timeout):
+        """Wait up to timeout for an event, then drain everything queued.
+
+        Placement events only matter for sensitive windows (blocking, or pruned
+        as not capturable) and are collapsed to one snapshot per window at the
+        end of the drain, so a drag costs one read; every other event is
+        handled in order.
+        """
+        moved = {}
+        window_event = self.source.get(timeout=max(timeout, 0))
+        while window_event is not None:
+            if window_event.event in placement_events:
+                if self._placement_matters(window_event.hwnd):
+                    moved[window_event.hwnd] = window_event
+            else:
+                if window_event.event in removal_events:
+                    moved.pop(window_event.hwnd, None)
+                self.handle_event(window_event)
+            window_event = self.source.get_nowait()
+        for window_event in moved.values():
+            self.handle_event(window_event)
+
+    def _placement_matters(self, hwnd):
+        if hwnd in self.table.blocking:
+            return True
+        record = self.table.windows.get(hwnd)
+        return record is not None and not record.visible
+
+    def _publish(self):
+        block_required = self.table.block_required
+        if block_required != self.block_required:
+            self.block_required = block_required
+            self.on_change(block_required, self.table.detected_by())
+
+
+def run_benchmark(window_count=200, sensitive_events=200):
+    """Measure detection latency and CPU per event against a replayed desktop."""
+    import statistics
+
+    keywords = [k.lower() for k in ("SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po")]
+    desktop = {hwnd: WindowRecord(f"Document {hwnd} - Word", hwnd, False, True)
+               for hwnd in range(1, window_count + 1)}
+
+    def evaluate(hwnd, record):
+        lowered = record.title.lower()
+        for keyword in keywords:
+            if keyword in lowered:
+                return None if record.minimized else ("msedge.exe", record.pid, keyword)
+        return None
+
+    source = ReplayWindowEventSource()
+    latencies = []
+    emitted = {}
+
+    def on_change(block_required, detected_by):
+        if block_required:
+            latencies.append(time.perf_counter() - emitted.pop('t'))
+
+    monitor = EventDrivenMonitor(source, WindowStateTable(evaluate), desktop.get, on_change)
+    monitor.resync(dict(desktop))
+
+    def on_emit(event, hwnd):
+        if event == EVENT_OBJECT_NAMECHANGE:
+            desktop[hwnd] = WindowRecord("SignPlus for OCBC Bank - Microsoft Edge", hwnd, False, True)
+            emitted['t'] = time.perf_counter()
+        elif event == EVENT_OBJECT_DESTROY:
+            desktop[hwnd] = WindowRecord(f"Document {hwnd} - Word", hwnd, False, True)
+
+    timeline = []
+    for i in range(sensitive_events):
+        hwnd = (i % window_count) + 1
+        timeline.append((0.002, EVENT_OBJECT_NAMECHANGE, hwnd))
+        timeline.append((0.002, EVENT_OBJECT_DESTROY, hwnd))
+    replay = source.replay(timeline, on_emit=on_emit)
+    while replay.is_alive() or not source.events.empty():
+        monitor.process_pending(timeout=0.05)
+
+    idle_started = time.process_time()
+    monitor.process_pending(timeout=1.0)
+    idle_cpu = time.process_time() - idle_started
+
+    print(f"windows: {window_count}, events: {monitor.events_processed}")
+    print(f"detection latency median: {statistics.median(latencies) * 1000:.3f} ms, "
+          f"max: {max(latencies) * 1000:.3f} ms")
+    print(f"cpu per event: {monitor.cpu_time / monitor.events_processed * 1e6:.1f} us")
+    print(f"idle cpu over 1 s: {idle_cpu * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,554 @@
+"""Batched window enumeration into a reusable array-backed snapshot.
+
+The pywin32 path costs up to five Python <-> Win32 transitions per window
+and cycle (IsWindowVisible, IsWindowEnabled, GetWindowText, then
+GetWindowThreadProcessId and IsIconic). NativeWindowProvider reads each
+window in one EnumWindows pass through ctypes prototypes bound once, with a
+reused title buffer and pid slot:
+
+    GetWindowLongW(GWL_STYLE)     visible, disabled and minimized in one call
+    GetWindowTextW                only for visible, enabled windows
+    GetWindowThreadProcessId      only for windows with a title
+
+Most top-level windows of a desktop are hidden, so they cost one call. The
+result lands in a WindowSnapshot (hwnd, pid, flags, title rows in arrays
+that keep their capacity between cycles, in z-order: row 0 is the topmost
+window) which feeds a WindowStateTable.
+
+With a window_filter other than "all", the placement of a window is read
+only once its title has matched: the controller asks capturable(hwnd) for
+each sensitive window, which reads its rectangle and DWM cloak state
+(windows on other virtual desktops are cloaked) and, for "unoccluded", the
+rectangles of the windows above it until one covers it. Windows that are
+cloaked, outside every monitor or covered are not capturable and do not
+require a block. From then on the window is watched: every scan re-reads
+its placement and observes it with visible=False while it cannot be
+captured, so it is re-evaluated as soon as it comes into view. Windows
+that never matched cost no extra calls; window_filter="all" skips the
+placement checks entirely.
+
+The Win32 calls go through an api object, so FakeUser32 drives the same code
+off Windows for tests and the benchmark.
+"""
+import ctypes
+from array import array
+
+from dlp_window_state import WindowRecord
+
+# Window styles (winuser.h) and DWM attributes (dwmapi.h)
+GWL_STYLE = -16
+GWL_EXSTYLE = -20
+WS_VISIBLE = 0x10000000
+WS_DISABLED = 0x08000000
+WS_MINIMIZE = 0x20000000
+WS_EX_LAYERED = 0x00080000
+WS_EX_TRANSPARENT = 0x00000020
+DWMWA_CLOAKED = 14
+
+# WindowSnapshot flags
+WINDOW_MINIMIZED = 0x1
+WINDOW_CLOAKED = 0x2
+WINDOW_OFFSCREEN = 0x4
+WINDOW_OCCLUDED = 0x8
+
+# Flags that make a window not capturable, per window_filter
+window_filters = {
+    "all": 0,
+    "on_screen": WINDOW_MINIMIZED | WINDOW_CLOAKED | WINDOW_OFFSCREEN,
+    "unoccluded": WINDOW_MINIMIZED | WINDOW_CLOAKED | WINDOW_OFFSCREEN | WINDOW_OCCLUDED,
+}
+
+# GetWindowRect includes the invisible resize borders; occluders are shrunk by this many pixels
+occluder_margin = 8
+
+title_buffer_size = 1024
+
+
+class Rect(ctypes.Structure):
+    _fields_ = [('left', ctypes.c_long), ('top', ctypes.c_long), ('right', ctypes.c_long), ('bottom', ctypes.c_long)]
+
+
+class WindowSnapshot:
+    """Rows of hwnd, pid, flags and title from one enumeration, topmost first."""
+
+    def __init__(self, hidden_flags=0):
+        self.hidden_flags = hidden_flags
+        self.hwnds = array('Q')
+        self.pids = array('L')
+        self.flags = array('B')
+        self.titles = []
+
+    def __len__(self):
+        return len(self.hwnds)
+
+    def clear(self):
+        del self.hwnds[:]
+        del self.pids[:]
+        del self.flags[:]
+        self.titles.clear()
+
+    def append(self, hwnd, pid, flags, title):
+        self.hwnds.append(hwnd)
+        self.pids.append(pid)
+        self.flags.append(flags)
+        self.titles.append(title)
+
+    def observe_into(self, table):
+        """Feed every row to a WindowStateTable snapshot; returns the number of changes."""
+        hidden_flags = self.hidden_flags
+        table.begin_snapshot()
+        for hwnd, pid, flags, title in zip(self.hwnds, self.pids, self.flags, self.titles):
+            table.observe(hwnd, title, pid, bool(flags & WINDOW_MINIMIZED), not flags & hidden_flags)
+        return table.end_snapshot()
+
+
+class User32Api:
+    """ctypes prototypes of the user32 calls used by NativeWindowProvider."""
+
+    def __init__(self):
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self.WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        self.EnumWindows = user32.EnumWindows
+        self.EnumWindows.argtypes = [self.WNDENUMPROC, wintypes.LPARAM]
+        self.EnumWindows.restype = wintypes.BOOL
+        self.GetWindowLongW = user32.GetWindowLongW
+        self.GetWindowLongW.argtypes = [wintypes.HWND, ctypes.c_int]
+        self.GetWindowLongW.restype = ctypes.c_long
+        self.GetWindowTextW = user32.GetWindowTextW
+        self.GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+        self.GetWindowTextW.restype = ctypes.c_int
+        self.GetWindowThreadProcessId = user32.GetWindowThreadProcessId
+        self.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+        self.GetWindowThreadProcessId.restype = wintypes.DWORD
+        self.IsWindow = user32.IsWindow
+        self.IsWindow.argtypes = [wintypes.HWND]
+        self.IsWindow.restype = wintypes.BOOL
+        self.GetWindowRect = user32.GetWindowRect
+        self.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(Rect)]
+        self.GetWindowRect.restype = wintypes.BOOL
+        dwmapi = ctypes.WinDLL('dwmapi')
+        self.DwmGetWindowAttribute = dwmapi.DwmGetWindowAttribute
+        self.DwmGetWindowAttribute.argtypes = [wintypes.HWND, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD]
+        self.DwmGetWindowAttribute.restype = ctypes.c_long
+        self.MONITORENUMPROC = ctypes.WINFUNCTYPE(
+            wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC, ctypes.POINTER(Rect), wintypes.LPARAM)
+        self.EnumDisplayMonitors = user32.EnumDisplayMonitors
+        self.EnumDisplayMonitors.argtypes = [wintypes.HDC, ctypes.c_void_p, self.MONITORENUMPROC, wintypes.LPARAM]
+        self.EnumDisplayMonitors.restype = wintypes.BOOL
+
+    def make_enum_proc(self, function):
+        return self.WNDENUMPROC(function)
+
+    def monitor_rects(self):
+        """(left, top, right, bottom) of every display monitor."""
+        rects = []
+
+        def collect(monitor, dc, rect, lparam):
+            rects.append((rect.contents.left, rect.contents.top, rect.contents.right, rect.contents.bottom))
+            return True
+
+        self.EnumDisplayMonitors(None, None, self.MONITORENUMPROC(collect), 0)
+        return rects
+
+
+class NativeWindowProvider:
+    """Window provider (scan/snapshot/capturable) that enumerates through batched ctypes calls.
+
+    window_filter is "all", "on_screen" or "unoccluded" (see window_filters).
+    watched holds the windows whose placement is re-read on every scan.
+    """
+
+    def __init__(self, api=None, window_filter="all"):
+        self.api = api or User32Api()
+        self.window_filter = window_filter
+        self.windows = WindowSnapshot(window_filters[window_filter])
+        self.watched = set()
+        self.monitors = []
+        self._scanning = False
+        self._occluders = []
+        self._occluders_read = 0
+        self._title = ctypes.create_unicode_buffer(title_buffer_size)
+        self._pid = ctypes.c_ulong()
+        self._pid_reference = ctypes.byref(self._pid)
+        self._rect = Rect()
+        self._rect_reference = ctypes.byref(self._rect)
+        self._cloaked = ctypes.c_int()
+        self._cloaked_reference = ctypes.byref(self._cloaked)
+        # Bound once and reused by every enumeration
+        self._enum_proc = self.api.make_enum_proc(self._observe)
+
+    def _observe(self, hwnd, lparam):
+        api = self.api
+        style = api.GetWindowLongW(hwnd, GWL_STYLE)
+        if not style & WS_VISIBLE or style & WS_DISABLED:
+            return True
+        if not api.GetWindowTextW(hwnd, self._title, title_buffer_size):
+            return True
+        title = self._title.value.strip()
+        if not title:
+            return True
+        api.GetWindowThreadProcessId(hwnd, self._pid_reference)
+        flags = WINDOW_MINIMIZED if style & WS_MINIMIZE else 0
+        if not flags and hwnd in self.watched:
+            flags = self._placement_flags(hwnd, len(self.windows))
+        self.windows.append(hwnd, self._pid.value, flags, title)
+        return True
+
+    def _placement_flags(self, hwnd, row=None):
+        """WINDOW_CLOAKED, WINDOW_OFFSCREEN and WINDOW_OCCLUDED of one window; row is its z-order row."""
+        api = self.api
+        if self._is_cloaked(hwnd):
+            return WINDOW_CLOAKED
+        api.GetWindowRect(hwnd, self._rect_reference)
+        rect = self._rect
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        if self.monitors:
+            for monitor_left, monitor_top, monitor_right, monitor_bottom in self.monitors:
+                if left < monitor_right and right > monitor_left and top < monitor_bottom and bottom > monitor_top:
+                    break
+            else:
+                return WINDOW_OFFSCREEN
+        # Without monitors (enumeration failed) every window counts as on-screen: fail closed
+        if (row is not None and self.windows.hidden_flags & WINDOW_OCCLUDED
+                and self._covered(row, left, top, right, bottom)):
+            return WINDOW_OCCLUDED
+        return 0
+
+    def _is_cloaked(self, hwnd):
+        return (self.api.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, self._cloaked_reference, 4) == 0
+                and bool(self._cloaked.value))
+
+    def _covered(self, row, left, top, right, bottom):
+        """Whether one opaque window in the snapshot rows above row covers the rectangle."""
+        for occluder_left, occluder_top, occluder_right, occluder_bottom in self._occluders:
+            if occluder_left <= left and occluder_top <= top and occluder_right >= right and occluder_bottom >= bottom:
+                return True
+        # Rectangles of the windows above are read once per scan, and only as far down as needed
+        api = self.api
+        windows = self.windows
+        while self._occluders_read < row:
+            above = windows.hwnds[self._occluders_read]
+            minimized = windows.flags[self._occluders_read] & WINDOW_MINIMIZED
+            self._occluders_read += 1
+            # Layered and click-through windows can be see-through, so they never occlude
+            if (minimized or api.GetWindowLongW(above, GWL_EXSTYLE) & (WS_EX_LAYERED | WS_EX_TRANSPARENT)
+                    or self._is_cloaked(above)):
+                continue
+            api.GetWindowRect(above, self._rect_reference)
+            rect = self._rect
+            occluder = (rect.left + occluder_margin, rect.top + occluder_margin,
+                        rect.right - occluder_margin, rect.bottom - occluder_margin)
+            self._occluders.append(occluder)
+            if occluder[0] <= left and occluder[1] <= top and occluder[2] >= right and occluder[3] >= bottom:
+                return True
+        return False
+
+    def capturable(self, hwnd):
+        """Whether a window whose title matched can be captured; watches its placement from now on.
+
+        Occlusion is only checked while a scan is feeding the table, against the
+        windows above it in that scan; single-window events check placement only.
+        """
+        if self.window_filter == "all":
+            return True
+        self.watched.add(hwnd)
+        row = None
+        if self._scanning:
+            try:
+                row = self.windows.hwnds.index(hwnd)
+            except ValueError:
+                pass
+        return not self._placement_flags(hwnd, row) & self.windows.hidden_flags
+
+    def capture(self):
+        """Enumerate the desktop into self.windows and return it."""
+        self.windows.clear()
+        if self.window_filter != "all":
+            self.monitors = self.api.monitor_rects()
+            self._occluders.clear()
+            self._occluders_read = 0
+        self.api.EnumWindows(self._enum_proc, 0)
+        if self.watched:
+            # Stop watching windows that are gone
+            self.watched.intersection_update(self.windows.hwnds)
+        return self.windows
+
+    def scan(self, table):
+        windows = self.capture()
+        self._scanning = True
+        try:
+            return windows.observe_into(table)
+        finally:
+            self._scanning = False
+
+    def snapshot(self, hwnd):
+        """Current record of one window; occlusion is not checked for single windows."""
+        api = self.api
+        if not api.IsWindow(hwnd):
+            return None
+        style = api.GetWindowLongW(hwnd, GWL_STYLE)
+        if not style & WS_VISIBLE or style & WS_DISABLED:
+            return None
+        if not api.GetWindowTextW(hwnd, self._title, title_buffer_size):
+            return None
+        title = self._title.value.strip()
+        if not title:
+            return None
+        api.GetWindowThreadProcessId(hwnd, self._pid_reference)
+        flags = WINDOW_MINIMIZED if style & WS_MINIMIZE else 0
+        if not flags and hwnd in self.watched:
+            flags = self._placement_flags(hwnd)
+        return WindowRecord(title, self._pid.value, bool(flags & WINDOW_MINIMIZED),
+                            not flags & self.windows.hidden_flags)
+
+
+class FakeDesktop:
+    """Top-level windows in z-order (topmost first) on a set of monitors.
+
+    windows maps hwnd -> [title, pid, visible, enabled, minimized, rect, cloaked, layered].
+    """
+
+    def __init__(self, monitors=((0, 0, 1920, 1080),)):
+        self.monitors = list(monitors)
+        self.windows = {}
+        self.calls = 0
+
+    def add(self, hwnd, title, pid, visible=True, enabled=True, minimized=False, rect=(0, 0, 800, 600),
+            cloaked=False, layered=False):
+        self.windows[hwnd] = [title, pid, visible, enabled, minimized, rect, cloaked, layered]
+
+
+class FakeUser32:
+    """User32Api replacement backed by a FakeDesktop."""
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def make_enum_proc(self, function):
+        return function
+
+    def EnumWindows(self, callback, lparam):
+        self.desktop.calls += 1
+        for hwnd in list(self.desktop.windows):
+            if not callback(hwnd, lparam):
+                break
+        return True
+
+    def IsWindow(self, hwnd):
+        self.desktop.calls += 1
+        return hwnd in self.desktop.windows
+
+    def monitor_rects(self):
+        self.desktop.calls += 1
+        return list(self.desktop.monitors)
+
+    def GetWindowLongW(self, hwnd, index):
+        self.desktop.calls += 1
+        title, pid, visible, enabled, minimized, rect, cloaked, layered = self.desktop.windows[hwnd]
+        if index == GWL_EXSTYLE:
+            return WS_EX_LAYERED if layered else 0
+        return ((WS_VISIBLE if visible else 0) | (0 if enabled else WS_DISABLED)
+                | (WS_MINIMIZE if minimized else 0))
+
+    def GetWindowRect(self, hwnd, rect_reference):
+        self.desktop.calls += 1
+        rect = rect_reference._obj
+        rect.left, rect.top, rect.right, rect.bottom = self.desktop.windows[hwnd][5]
+        return True
+
+    def DwmGetWindowAttribute(self, hwnd, attribute, value_reference, size):
+        self.desktop.calls += 1
+        value_reference._obj.value = int(self.desktop.windows[hwnd][6])
+        return 0
+
+    def GetWindowTextW(self, hwnd, buffer, size):
+        self.desktop.calls += 1
+        title = self.desktop.windows[hwnd][0][:size - 1]
+        buffer.value = title
+        return len(title)
+
+    def GetWindowThreadProcessId(self, hwnd, pid_reference):
+        self.desktop.calls += 1
+        pid_reference._obj.value = self.desktop.windows[hwnd][1]
+        return 1
+
+
+class FakePywin32:
+    """win32gui/win32process replacement backed by a FakeDesktop, for Win32WindowProvider."""
+
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def EnumWindows(self, callback, extra):
+        self.desktop.calls += 1
+        for hwnd in list(self.desktop.windows):
+            callback(hwnd, extra)
+
+    def IsWindow(self, hwnd):
+        self.desktop.calls += 1
+        return hwnd in self.desktop.windows
+
+    def IsWindowVisible(self, hwnd):
+        self.desktop.calls += 1
+        return self.desktop.windows[hwnd][2]
+
+    def IsWindowEnabled(self, hwnd):
+        self.desktop.calls += 1
+        return self.desktop.windows[hwnd][3]
+
+    def IsIconic(self, hwnd):
+        self.desktop.calls += 1
+        return self.desktop.windows[hwnd][4]
+
+    def GetWindowText(self, hwnd):
+        self.desktop.calls += 1
+        return self.desktop.windows[hwnd][0]
+
+    def GetWindowThreadProcessId(self, hwnd):
+        self.desktop.calls += 1
+        return 1, self.desktop.windows[hwnd][1]
+
+
+def run_benchmark(window_count=500, visible_share=0.3, cycles=2000, live=False):
+    """Compare the pywin32 provider with NativeWindowProvider at window_count windows.
+
+    Off Windows both paths run against the same FakeDesktop, which counts the
+    Win32 calls each makes per scan; the fakes' own cost swamps the Python
+    side, so scan times are only printed for the live desktop (live=True).
+    """
+    import random
+    import time
+
+    from dlp_providers import Win32WindowProvider
+    from dlp_window_state import WindowStateTable
+
+    def time_scans(provider):
+        table = WindowStateTable(lambda hwnd, record: None)
+        provider.scan(table)
+        started = time.perf_counter()
+        for _ in range(cycles):
+            provider.scan(table)
+        return (time.perf_counter() - started) / cycles, table
+
+    if live:
+        for name, provider in (("pywin32", Win32WindowProvider()), ("native", NativeWindowProvider())):
+            per_scan, table = time_scans(provider)
+            print(f"{name:8} live desktop: {len(table.windows)} windows, {per_scan * 1e6:.0f} us per scan")
+        return
+
+    rng = random.Random(11)
+    desktop = FakeDesktop()
+    for hwnd in range(0x10000, 0x10000 + window_count * 4, 4):
+        visible = rng.random() < visible_share
+        desktop.add(hwnd, f"Window {hwnd:x} - Application" if visible or rng.random() < 0.5 else "",
+                    rng.randrange(1000, 9000), visible, rng.random() > 0.02, visible and rng.random() < 0.1)
+    pywin32 = FakePywin32(desktop)
+    tables = {}
+    for name, provider in (("pywin32", Win32WindowProvider(pywin32, pywin32)),
+                           ("native", NativeWindowProvider(FakeUser32(desktop)))):
+        desktop.calls = 0
+        _, tables[name] = time_scans(provider)
+        calls = desktop.calls / (cycles + 1)
+        print(f"{name:8} {window_count} windows ({len(tables[name].windows)} qualifying): "
+              f"{calls:.0f} Win32 calls per scan, {calls / window_count:.2f} per window "
+              f"(+1 enumeration callback per window on both paths)")
+    same = {hwnd: repr(record) for hwnd, record in tables["pywin32"].windows.items()} == \
+        {hwnd: repr(record) for hwnd, record in tables["native"].windows.items()}
+    print(f"identical window tables: {same}")
+
+
+def run_pruning_benchmark(window_count=300, cycles=500, churn=10):
+    """Scan cost and block decision per window_filter on a synthetic two-monitor desktop of window_count windows.
+
+    A third of the windows sit on other virtual desktops (cloaked), some are
+    minimized or parked off-screen, and a maximized browser on the primary
+    monitor covers most of the windows below it. The sensitive page is open
+    in two browser windows that cannot be captured: one on another virtual
+    desktop and one under the maximized browser. Every cycle churn windows
+    change title; the real DlpController evaluates them.
+    """
+    import logging
+    import random
+    import time
+
+    from dlp_controller import DlpController
+    from dlp_metrics import LoopMetrics
+    from dlp_policy import compile_policy
+    from dlp_providers import SimulatedKeyboard, SimulatedProcessTable, StaticPolicySource
+    from dlp_registry import HivePolicyApplier, MemoryRegistryBackend, RegistryReconciler
+
+    logging.disable(logging.WARNING)
+    policy = compile_policy({
+        "browser_keywords": {"msedge.exe": ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po"]},
+        "specific_programs": ["javaw.exe"],
+        "other_keywords": ["SignPlus for OCBC Bank", "edit account", "new signatory"],
+        "blocked_tools": {"SnippingTool": "SnippingTool.exe"},
+    })
+    names = ["msedge.exe", "javaw.exe", "winword.exe", "outlook.exe", "teams.exe"]
+
+    def build_desktop():
+        rng = random.Random(19)
+        desktop = FakeDesktop(monitors=((0, 0, 1920, 1080), (1920, 0, 3840, 1080)))
+        # Topmost: a maximized browser on the primary monitor
+        desktop.add(0x1000, "Intranet - Microsoft Edge", 1000, rect=(-8, -8, 1928, 1088))
+        desktop.add(0x1004, "SignPlus for OCBC Bank - Microsoft Edge", 1000, rect=(100, 100, 1300, 900))
+        desktop.add(0x1008, "SignPlus for OCBC Bank - Microsoft Edge", 1000, rect=(100, 100, 1300, 900),
+                    cloaked=True)
+        for index in range(3, window_count):
+            hwnd = 0x1000 + index * 4
+            pid = 1000 + index % len(names)
+            roll = rng.random()
+            if roll < 0.33:
+                desktop.add(hwnd, f"Document {index} - Word", pid, rect=(100, 100, 900, 700), cloaked=True)
+            elif roll < 0.45:
+                desktop.add(hwnd, f"Document {index} - Word", pid, minimized=True,
+                            rect=(-32000, -32000, -31840, -31972))
+            elif roll < 0.50:
+                desktop.add(hwnd, f"Tool {index}", pid, rect=(-5000, 0, -4200, 600))
+            elif roll < 0.80:
+                x, y = rng.randrange(0, 1100), rng.randrange(0, 480)
+                desktop.add(hwnd, f"Document {index} - Word", pid, rect=(x, y, x + 800, y + 600))
+            else:
+                x, y = rng.randrange(1920, 3000), rng.randrange(0, 480)
+                desktop.add(hwnd, f"Document {index} - Word", pid, rect=(x, y, x + 800, y + 600))
+        return desktop
+
+    print(f"{window_count} windows, {churn} title changes per cycle, {cycles} cycles")
+    for window_filter in window_filters:
+        desktop = build_desktop()
+        processes = SimulatedProcessTable()
+        for index, name in enumerate(names):
+            processes.start(1000 + index, name)
+        provider = NativeWindowProvider(FakeUser32(desktop), window_filter)
+        reconciler = RegistryReconciler(HivePolicyApplier(MemoryRegistryBackend(["S-1-5-21-1"]), max_workers=1))
+        metrics = LoopMetrics(("enumerate", "resolve", "match", "enforce", "registry"),
+                              latencies=("detection_to_block",))
+        controller = DlpController(provider, processes, SimulatedKeyboard(), reconciler, StaticPolicySource(policy),
+                                   r"Software\Policies\DisallowRun", metrics)
+        table = controller.window_table
+        provider.scan(table)
+        initial_evaluations = table.evaluations
+        rng = random.Random(23)
+        hwnds = list(desktop.windows)
+        desktop.calls = 0
+        scan_time = 0.0
+        for cycle in range(cycles):
+            for hwnd in rng.sample(hwnds[3:], churn):
+                desktop.windows[hwnd][0] = f"Document {hwnd} ({cycle}) - Word"
+            started = time.perf_counter()
+            provider.scan(table)
+            scan_time += time.perf_counter() - started
+            controller.apply_block_state(table.block_required, table.detected_by())
+        evaluations = (table.evaluations - initial_evaluations) / cycles
+        print(f"  {window_filter:10}: {desktop.calls / cycles:5.0f} Win32 calls per scan (fake API), "
+              f"{scan_time / cycles * 1e6:5.0f} us per scan, {evaluations:4.1f} evaluations per cycle, "
+              f"watched: {len(provider.watched)}, blocked: {controller.block_print_screen}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    run_benchmark(live="--live" in sys.argv)
+    run_pruning_benchmark()
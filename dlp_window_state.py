@@ -0,0 +1,198 @@
+"""Incremental window-state table for the SVS block decision.
+
+The table remembers hwnd -> WindowRecord from the previous snapshot. Each new
+snapshot is diffed against it and only added or changed windows are passed to
+the evaluator, while the set of windows currently requiring a block is kept
+up to date incrementally.
+
+Snapshots are fed with begin_snapshot / observe / end_snapshot so a steady
+desktop is scanned without allocating: unchanged records are matched field
+by field and stamped with the current scan generation instead of being
+rebuilt.
+"""
+
+
+class WindowRecord:
+    """Compact record of the window fields the block decision depends on."""
+
+    __slots__ = ('title', 'pid', 'minimized', 'visible', 'generation')
+
+    def __init__(self, title, pid, minimized, visible, generation=0):
+        self.title = title
+        self.pid = pid
+        self.minimized = minimized
+        self.visible = visible
+        self.generation = generation
+
+    def same_as(self, title, pid, minimized, visible):
+        return (self.title == title and self.pid == pid
+                and self.minimized == minimized and self.visible == visible)
+
+    def __eq__(self, other):
+        if not isinstance(other, WindowRecord):
+            return NotImplemented
+        return other.same_as(self.title, self.pid, self.minimized, self.visible)
+
+    def __repr__(self):
+        return (f"WindowRecord(title={self.title!r}, pid={self.pid}, "
+                f"minimized={self.minimized}, visible={self.visible})")
+
+
+class WindowStateTable:
+    """Track window records and the windows that currently require blocking.
+
+    evaluate(hwnd, record) returns a detection tuple (process_name, pid, keyword)
+    when the window requires blocking, otherwise None.
+    """
+
+    def __init__(self, evaluate):
+        self.evaluate = evaluate
+        self.windows = {}
+        self.blocking = {}
+        self.evaluations = 0
+        self.last_changes = 0
+        self.generation = 0
+        self._changes = 0
+        self._stale = []
+
+    @property
+    def block_required(self):
+        return bool(self.blocking)
+
+    def detected_by(self):
+        for detection in self.blocking.values():
+            return detection
+        return None
+
+    def update(self, hwnd, record):
+        """Apply the current record of one window; None means it is gone."""
+        if record is None:
+            if self.windows.pop(hwnd, None) is None:
+                return False
+            self.blocking.pop(hwnd, None)
+            return True
+        return self.observe(hwnd, record.title, record.pid, record.minimized, record.visible)
+
+    def begin_snapshot(self):
+        self.generation += 1
+        self._changes = 0
+
+    def observe(self, hwnd, title, pid, minimized, visible):
+        """Record one window of the current snapshot; returns True if it changed."""
+        record = self.windows.get(hwnd)
+        if record is not None and record.same_as(title, pid, minimized, visible):
+            record.generation = self.generation
+            return False
+        if record is None:
+            record = self.windows[hwnd] = WindowRecord(title, pid, minimized, visible, self.generation)
+        else:
+            record.title = title
+            record.pid = pid
+            record.minimized = minimized
+            record.visible = visible
+            record.generation = self.generation
+        detection = self.evaluate(hwnd, record)
+        self.evaluations += 1
+        if detection:
+            self.blocking[hwnd] = detection
+        else:
+            self.blocking.pop(hwnd, None)
+        self._changes += 1
+        return True
+
+    def end_snapshot(self):
+        """Drop windows not observed since begin_snapshot; returns the number of changes."""
+        generation = self.generation
+        stale = self._stale
+        for hwnd, record in self.windows.items():
+            if record.generation != generation:
+                stale.append(hwnd)
+        for hwnd in stale:
+            del self.windows[hwnd]
+            self.blocking.pop(hwnd, None)
+        self._changes += len(stale)
+        stale.clear()
+        self.last_changes = self._changes
+        return self._changes
+
+    def apply_snapshot(self, snapshot):
+        """Diff a full {hwnd: WindowRecord} snapshot; returns the number of changes."""
+        self.begin_snapshot()
+        for hwnd, record in snapshot.items():
+            self.observe(hwnd, record.title, record.pid, record.minimized, record.visible)
+        return self.end_snapshot()
+
+    def reevaluate(self):
+        """Re-run the evaluator on every known window, e.g. after a policy change."""
+        self.blocking.clear()
+        for hwnd, record in self.windows.items():
+            detection = self.evaluate(hwnd, record)
+            self.evaluations += 1
+            if detection:
+                self.blocking[hwnd] = detection
+        return len(self.windows)
+
+    def clear(self):
+        self.windows.clear()
+        self.blocking.clear()
+
+
+def run_memory_benchmark(cycles=10000, window_count=200, warmup=1000, max_growth_kib=64):
+    """Run simulated cycles and fail if allocations or RSS keep growing after warmup."""
+    import os
+    import sys
+    import tracemalloc
+
+    import psutil
+
+    from dlp_keywords import compile_process_keywords
+
+    matchers = compile_process_keywords(
+        {"msedge.exe": ["SignPlus for OCBC Bank", "ocbc retrieval", "ocbc po"]},
+        ["javaw.exe"], ["edit account", "new signatory"])
+    names = {pid: ("msedge.exe" if pid % 3 == 0 else "javaw.exe" if pid % 3 == 1 else "excel.exe")
+             for pid in range(window_count)}
+    titles = [f"Window {hwnd} - Application" for hwnd in range(window_count)]
+    titles[7] = "SignPlus for OCBC Bank - Microsoft Edge"
+
+    def evaluate(hwnd, record):
+        matcher = matchers.get(names[record.pid])
+        if matcher is None or record.minimized:
+            return None
+        keyword = matcher.search(record.title)
+        return (names[record.pid], record.pid, keyword) if keyword else None
+
+    table = WindowStateTable(evaluate)
+
+    def cycle(number):
+        table.begin_snapshot()
+        for hwnd in range(window_count):
+            # One window toggles minimized every cycle to keep some churn going
+            table.observe(hwnd, titles[hwnd], hwnd, hwnd == number % window_count, True)
+        table.end_snapshot()
+
+    process = psutil.Process(os.getpid())
+    for number in range(warmup):
+        cycle(number)
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    rss_before = process.memory_info().rss
+    for number in range(warmup, warmup + cycles):
+        cycle(number)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = process.memory_info().rss
+
+    growth_kib = (current - baseline) / 1024
+    rss_growth_kib = (rss_after - rss_before) / 1024
+    print(f"cycles: {cycles}, windows: {window_count}, evaluations: {table.evaluations}")
+    print(f"traced growth: {growth_kib:.1f} KiB (peak {(peak - baseline) / 1024:.1f} KiB), "
+          f"RSS growth: {rss_growth_kib:.1f} KiB")
+    if growth_kib > max_growth_kib or rss_growth_kib > max_growth_kib * 16:
+        print("FAIL: steady-state memory is growing")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    run_memory_benchmark()
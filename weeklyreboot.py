@@ -8,7 +8,6 @@ import winreg
 import wmi
 import os
 import threading
-import gc
 
 # Set up logging to a rotating file
 log_file_path = r"C:\temp\weeklyreboot.log"
@@ -44,6 +43,7 @@ logger.setLevel(logging.DEBUG)
 # Global variables to manage the countdown gadget
 gadget_running = False
 gadget_lock = threading.Lock()
+boot_datetime = None
 
 # Create a rotating file handler that backs up the file once it reaches 5MB, keeping 5 backup files.
 handler = RotatingFileHandler(log_file_path, maxBytes=5 * 1024 * 1024, backupCount=5)
@@ -87,13 +87,16 @@ def write_registry_value(value):
 
 # Function to get system uptime using WMI
 def get_system_uptime():
+    # The boot time cannot change while this process runs, so WMI is only queried once
+    global boot_datetime
     try:
-        c = wmi.WMI()
-        for os in c.Win32_OperatingSystem():
-            last_boot_time = os.LastBootUpTime.split('.')[0]
-            last_boot_datetime = datetime.datetime.strptime(last_boot_time, '%Y%m%d%H%M%S')
-            uptime_seconds = (datetime.datetime.now() - last_boot_datetime).total_seconds()
-            return uptime_seconds, last_boot_datetime
+        if boot_datetime is None:
+            c = wmi.WMI()
+            for os in c.Win32_OperatingSystem():
+                last_boot_time = os.LastBootUpTime.split('.')[0]
+                boot_datetime = datetime.datetime.strptime(last_boot_time, '%Y%m%d%H%M%S')
+        uptime_seconds = (datetime.datetime.now() - boot_datetime).total_seconds()
+        return uptime_seconds, boot_datetime
     except Exception as e:
         logging.error(f"Error detecting uptime: {e}")
         return None, None
@@ -304,7 +307,6 @@ def main():
 
         # Sleep for 1 min before checking again
         time.sleep(60)
-        gc.collect()
 
 if __name__ == "__main__":
     main()